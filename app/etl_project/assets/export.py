@@ -1,38 +1,24 @@
 import pandas as pd
-import requests
 from pathlib import Path
 from sqlalchemy import Table, MetaData
 from etl_project.connectors.postgresql import PostgreSqlClient
+from etl_project.connectors.data_fetcher import iter_pages
 
 
-def extract(indicator, date_range):
+def extract(indicator, date_range, per_page="adaptive"):
     """
     Extract data from the monitor database
     """
     print("Starting extract")
-    base_url = f"https://api.worldbank.org/v2/countries/all/indicators/{indicator}"
-
-    params = {"date": date_range, "format": "json", "page": 1}  # Start at page 1
-
     export_data = []
-
-    while True:
-        response = requests.get(base_url, params=params)
-
-        if response.status_code != 200:
-            print(f"Error: Unable to fetch data (Status code: {response.status_code})")
-            break
-        # print(response.status_code)
-        response_data = response.json()
-
-        if len(response_data) < 2 or not response_data[1]:  # Check if there's data
-            print("No data available.")
-            break
-
+    for page_records in iter_pages(
+        indicator=indicator, date_range=date_range, per_page=per_page
+    ):
         # Add current page data to all_data
-        export_data.extend(response_data[1])
-        # Update parameters for the next page
-        params["page"] += 1
+        export_data.extend(page_records)
+
+    if not export_data:
+        print("No data available.")
 
     df_export = pd.json_normalize(data=export_data)
 
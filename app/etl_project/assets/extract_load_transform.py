@@ -1,49 +1,156 @@
-from etl_project.connectors.data_fetcher import fetch_data_from_api
-from jinja2 import Environment, Template
+from etl_project.connectors.data_fetcher import (
+    fetch_data_from_api,
+    fetch_data_for_indicators,
+    fetch_chunks_from_api,
+)
+from etl_project.assets.sql_templates import render_sql
+from etl_project.assets.ranking import rank_indicator, get_ranked_table
+from etl_project.assets.region_classification import get_region_classification
+from etl_project.assets.watermark import WatermarkStore
+import threading
+from typing import Iterator, Union
 import pandas as pd
 import requests
-from sqlalchemy import Table, MetaData, inspect, text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Float,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    inspect,
+    text,
+)
 from sqlalchemy.engine import URL, Engine
-from etl_project.connectors.postgresql import PostgreSqlClient
+from sqlalchemy.dialects import postgresql
+from etl_project.connectors.postgresql import PostgreSqlClient, iter_batches
 
+# the World Bank fields used by transform, other fields can be skipped on extract
+EXTRACT_FIELDS = [
+    "date",
+    "countryiso3code",
+    "country.value",
+    "indicator.id",
+    "indicator.value",
+    "value",
+]
 
-# extract from WB
-def extract(
+
+def get_indicator_table(
+    table_name: str, row_hash: bool = False
+) -> tuple[Table, MetaData]:
+    """
+    Returns the sqlalchemy table of transformed indicator data. With `row_hash`,
+    the table has a row_hash column, see `load`.
+    """
+    metadata = MetaData()
+    table = Table(
+        table_name,
+        metadata,
+        Column("year", Integer, primary_key=True),
+        Column("country_code", String, primary_key=True),
+        Column("country_name", String),
+        Column("indicator_id", String),
+        Column("indicator_value", String),
+        Column("value", Float),
+        Column("region", String),
+    )
+    if row_hash:
+        table.append_column(Column("row_hash", BigInteger))
+    return table, metadata
+
+
+def get_extract_date_range(
     postgresql_client: PostgreSqlClient,
     extract_type,
     incremental_column,
     table_name,
-    wb_indicator,
     wb_daterange,
-) -> pd.DataFrame:
+    wb_indicator: str = None,
+    last_updated: str = None,
+    lookback_years: int = 0,
+) -> str:
     """
-    Extract data from the monitor database
-    """
-    print("Starting extract")
+    Returns the World Bank date range param to extract for a table.
 
+    Incremental extracts start after the last year of the indicator's
+    watermark. If the World Bank data was updated since the watermark was
+    saved, i.e. `last_updated` differs, the last years of the look-back window
+    are extracted again to pick up revisions. The window is the watermark's
+    own `lookback_years`, `lookback_years` is the default for indicators
+    without one.
+    """
     # goal is for our tables to fetch incremental data from WB
     if extract_type == "full":
         date_range = wb_daterange  # use the date range specified in yaml
     elif extract_type == "incremental":
-        # get max year in postgres table since year is the incremental column.
-        # first, check if table exists
-        if postgresql_client.table_exists(table_name):
+        watermark = WatermarkStore(postgresql_client).get(wb_indicator)
+        if watermark is None and postgresql_client.table_exists(table_name):
+            # tables loaded before watermarks existed, their max year is read once
             sql_response = postgresql_client.run_sql(
                 text(
                     f"select max({incremental_column}) as incremental_value from {table_name}"
                 )
             )
             incremental_value = sql_response[0].get("incremental_value")
+            if incremental_value is not None:
+                watermark = {
+                    "last_year": incremental_value,
+                    "last_updated": None,
+                    "lookback_years": None,
+                }
+
+        if watermark is None:
             date_range = (
-                f"{incremental_value + 1}:{incremental_value + 1}"  # max year + 1
+                wb_daterange  # no data yet, use the full date range specified in yaml
             )
         else:
-            date_range = wb_daterange  # if table doesn't exist, use the full date range specified in yaml
+            next_year = watermark["last_year"] + 1
+            if last_updated is not None and last_updated == watermark["last_updated"]:
+                first_year = next_year  # nothing was revised since the last extract
+            elif watermark["lookback_years"] is not None:
+                first_year = next_year - watermark["lookback_years"]
+            else:
+                first_year = next_year - lookback_years
+            date_range = f"{first_year}:{next_year}"
 
-    print(f"Date range param for api: {date_range}")
+    return date_range
+
+
+def update_watermark(
+    postgresql_client: PostgreSqlClient,
+    wb_indicator: str,
+    years_loaded: list[int],
+    last_updated: str,
+    lookback_years: int = 0,
+) -> None:
+    """
+    Saves the watermark of an indicator after its data was loaded, so the next
+    incremental extract starts after the last year loaded.
+
+    `lookback_years` is only stored with the first watermark of an indicator,
+    after that the stored window is kept, so it can be tuned per indicator in
+    the watermark table.
+    """
+    watermark_store = WatermarkStore(postgresql_client)
+    watermark = watermark_store.get(wb_indicator)
+    last_years = list(years_loaded)
+    if watermark is not None and watermark["last_year"] is not None:
+        last_years.append(watermark["last_year"])
+    if not last_years:
+        return  # nothing loaded yet
+    if watermark is not None and watermark["lookback_years"] is not None:
+        lookback_years = watermark["lookback_years"]
+    watermark_store.save(
+        wb_indicator=wb_indicator,
+        last_year=max(last_years),
+        last_updated=last_updated,
+        lookback_years=lookback_years,
+    )
 
-    df = fetch_data_from_api(indicator=wb_indicator, date_range=date_range)
 
+def log_extracted_years(df: pd.DataFrame, date_range: str) -> None:
     if df.empty:  # this means our table is already updated with latest data in WB
         print(
             f"Incremental extract is empty. {date_range} data is not yet available in World Bank."
@@ -52,10 +159,164 @@ def extract(
         distinct_years = df["date"].unique()
         print(f"Year extracted from World Bank api: {distinct_years}")
 
+
+# extract from WB
+def extract(
+    postgresql_client: PostgreSqlClient,
+    extract_type,
+    incremental_column,
+    table_name,
+    wb_indicator,
+    wb_daterange,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+    last_updated: str = None,
+    lookback_years: int = 0,
+) -> pd.DataFrame:
+    """
+    Extract data from the monitor database. Pass `fields=EXTRACT_FIELDS` to
+    skip normalizing the fields transform doesn't use.
+    `last_updated` and `lookback_years` pick the years of an incremental
+    extract, see `get_extract_date_range`.
+    """
+    print("Starting extract")
+
+    date_range = get_extract_date_range(
+        postgresql_client=postgresql_client,
+        extract_type=extract_type,
+        incremental_column=incremental_column,
+        table_name=table_name,
+        wb_daterange=wb_daterange,
+        wb_indicator=wb_indicator,
+        last_updated=last_updated,
+        lookback_years=lookback_years,
+    )
+
+    print(f"Date range param for api: {date_range}")
+
+    df = fetch_data_from_api(
+        indicator=wb_indicator,
+        date_range=date_range,
+        fields=fields,
+        per_page=per_page,
+    )
+
+    log_extracted_years(df=df, date_range=date_range)
+
     print("Completed extract")
     return pd.DataFrame(df)
 
 
+# extract from WB in chunks
+def extract_stream(
+    postgresql_client: PostgreSqlClient,
+    extract_type,
+    incremental_column,
+    table_name,
+    wb_indicator,
+    wb_daterange,
+    chunk_rows: int = 10000,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+    last_updated: str = None,
+    lookback_years: int = 0,
+) -> Iterator[pd.DataFrame]:
+    """
+    Extract data from the monitor database as a stream of dataframes of about
+    `chunk_rows` rows each. Pass `fields=EXTRACT_FIELDS` to skip normalizing
+    the fields transform doesn't use.
+    `last_updated` and `lookback_years` pick the years of an incremental
+    extract, see `get_extract_date_range`.
+    """
+    print("Starting stream extract")
+
+    date_range = get_extract_date_range(
+        postgresql_client=postgresql_client,
+        extract_type=extract_type,
+        incremental_column=incremental_column,
+        table_name=table_name,
+        wb_daterange=wb_daterange,
+        wb_indicator=wb_indicator,
+        last_updated=last_updated,
+        lookback_years=lookback_years,
+    )
+
+    print(f"Date range param for api: {date_range}")
+
+    yield from fetch_chunks_from_api(
+        indicator=wb_indicator,
+        date_range=date_range,
+        chunk_rows=chunk_rows,
+        fields=fields,
+        per_page=per_page,
+    )
+
+    print("Completed stream extract")
+
+
+# extract many WB indicators at once
+def extract_batch(
+    postgresql_client: PostgreSqlClient,
+    extract_type,
+    incremental_column,
+    table_config: dict,
+    wb_daterange,
+    wb_source,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+    last_updated: dict[str, str] = None,
+    lookback_years: int = 0,
+) -> dict[str, pd.DataFrame]:
+    """
+    Extract data of every configured indicator from the monitor database,
+    batching indicators that share a date range into a single api request.
+
+    Args:
+        table_config: mapping of wb indicator to table name
+        wb_source: World Bank source id shared by the indicators
+        fields: fields to keep, e.g. EXTRACT_FIELDS. Defaults to all fields.
+        per_page: rows per api page, or "adaptive" to size pages from the total
+        last_updated: mapping of wb indicator to its World Bank lastupdated date
+        lookback_years: past years extracted again when an indicator was updated
+
+    Returns:
+        mapping of wb indicator to its extracted dataframe
+    """
+    print("Starting batch extract")
+
+    # indicators can only share a request if they need the same date range
+    indicators_by_date_range = {}
+    for wb_indicator, table_name in table_config.items():
+        date_range = get_extract_date_range(
+            postgresql_client=postgresql_client,
+            extract_type=extract_type,
+            incremental_column=incremental_column,
+            table_name=table_name,
+            wb_daterange=wb_daterange,
+            wb_indicator=wb_indicator,
+            last_updated=(last_updated or {}).get(wb_indicator),
+            lookback_years=lookback_years,
+        )
+        indicators_by_date_range.setdefault(date_range, []).append(wb_indicator)
+
+    extracted_dfs = {}
+    for date_range, wb_indicators in indicators_by_date_range.items():
+        print(f"Date range param for api: {date_range}, indicators: {wb_indicators}")
+        indicator_dfs = fetch_data_for_indicators(
+            indicators=wb_indicators,
+            date_range=date_range,
+            source=wb_source,
+            fields=fields,
+            per_page=per_page,
+        )
+        for wb_indicator, df in indicator_dfs.items():
+            log_extracted_years(df=df, date_range=date_range)
+            extracted_dfs[wb_indicator] = pd.DataFrame(df)
+
+    print("Completed batch extract")
+    return extracted_dfs
+
+
 # transfom
 def transform(df: pd.DataFrame, region_file_path) -> pd.DataFrame:
     if df.empty:
@@ -64,16 +325,7 @@ def transform(df: pd.DataFrame, region_file_path) -> pd.DataFrame:
         print("Starting transform")
 
         # select some columns
-        df_selected = df[
-            [
-                "date",
-                "countryiso3code",
-                "country.value",
-                "indicator.id",
-                "indicator.value",
-                "value",
-            ]
-        ]
+        df_selected = df[EXTRACT_FIELDS]
 
         # rename column names
         df_renamed = df_selected.rename(
@@ -89,24 +341,35 @@ def transform(df: pd.DataFrame, region_file_path) -> pd.DataFrame:
         # Remove NaN from the Year and value column
         df_cleaned = df_renamed.dropna(subset=["year"]).dropna(subset=["value"])
 
-        # change datatype of year
-        df_cleaned = df_cleaned.astype({"year": "int64"})
-
-        df_region = pd.read_csv(
-            region_file_path, usecols=["Code", "Region"]
-        )  # "data/CLASS_CSV.csv"
-
-        df_region = df_region.rename(columns={"Region": "region"})
-
-        # merge with region class file
-        df_final = pd.merge(
-            left=df_cleaned,
-            right=df_region,
-            left_on="country_code",
-            right_on="Code",
+        # compact datatypes, the string columns repeat the same few values
+        df_cleaned = df_cleaned.astype(
+            {
+                "year": "int16",
+                "country_code": "category",
+                "country_name": "category",
+                "indicator_id": "category",
+                "indicator_value": "category",
+                "value": "float64",
+            }
         )
 
-        df_final = df_final.drop(["Code"], axis=1)
+        # look up regions in the cached region class file, keeping only
+        # countries present in the file like an inner join would
+        region_classification = get_region_classification(region_file_path)
+        df_final = df_cleaned[
+            region_classification.contains(df_cleaned["country_code"])
+        ].reset_index(drop=True)
+        df_final["region"] = (
+            df_final["country_code"]
+            .astype("object")
+            .map(region_classification.region)
+            .astype("category")
+        )
+        # drop categories of rows filtered out above
+        categorical_columns = df_final.select_dtypes("category").columns
+        df_final[categorical_columns] = df_final[categorical_columns].apply(
+            lambda column: column.cat.remove_unused_categories()
+        )
 
         print("Completed transform")
         df = df_final
@@ -114,6 +377,46 @@ def transform(df: pd.DataFrame, region_file_path) -> pd.DataFrame:
     return pd.DataFrame(df)
 
 
+def add_row_hash(df: pd.DataFrame, key_columns: list[str]) -> pd.DataFrame:
+    """
+    Adds a row_hash column with a 64 bit hash of the non-key columns, so the
+    load can skip rows that are unchanged since the last run.
+    """
+    value_columns = [
+        column
+        for column in df.columns
+        if column not in key_columns and column != "row_hash"
+    ]
+    row_hash = pd.util.hash_pandas_object(df[value_columns], index=False)
+    # postgres has no unsigned bigint
+    return df.assign(row_hash=row_hash.to_numpy().view("int64"))
+
+
+_row_hash_tables: set[tuple[str, str]] = set()
+_row_hash_tables_lock = threading.Lock()
+
+
+def add_row_hash_column(postgresql_client: PostgreSqlClient, table: Table) -> None:
+    """
+    Adds the row_hash column to a table created before row hashing, whose rows
+    are then rewritten once. Checked once per database, table and process, and
+    the alter table, which locks the table, only runs if the column is missing.
+    """
+    key = (str(postgresql_client.engine.url), table.name)
+    with _row_hash_tables_lock:
+        if key in _row_hash_tables:
+            return
+        inspector = inspect(postgresql_client.engine)
+        # new tables are created with the column by the load itself
+        if inspector.has_table(table.name) and "row_hash" not in {
+            column["name"] for column in inspector.get_columns(table.name)
+        }:
+            postgresql_client.execute_sql(
+                f"alter table {table.name} add column if not exists row_hash bigint"
+            )
+        _row_hash_tables.add(key)
+
+
 # load into postgres
 def load(
     df: pd.DataFrame,
@@ -121,7 +424,9 @@ def load(
     table: Table,
     metadata: MetaData,
     load_method,
-) -> pd.DataFrame:
+    chunk_size: int = 5000,
+    commit_per_chunk: bool = False,
+) -> list[dict]:
     """
     Load dataframe to a database.
         Args:
@@ -129,44 +434,221 @@ def load(
             postgresql_client: postgresql client
             table: sqlalchemy table
             metadata: sqlalchemy metadata
-            load_method: supports one of: [insert, upsert, overwrite]
+            load_method: supports one of: [insert, upsert, overwrite, copy].
+                copy upserts through a COPY into a staging table, which is
+                the fastest option for large loads.
+            chunk_size: maximum rows per upsert statement
+            commit_per_chunk: commit each upsert batch instead of one transaction
+        Returns:
+            the row, inserted and updated counts and duration of each upsert
+            batch, or of the whole copy
+
+    If the table has a row_hash column, it is computed from the other non-key
+    columns and upsert and copy only rewrite rows whose hash changed.
     """
+    batch_stats = []
 
     if df.empty:
         print("Incremental extract is empty. No data to load.")
     else:
         print("Starting load")
+        if "row_hash" in table.columns:
+            df = add_row_hash(
+                df=df,
+                key_columns=[column.name for column in table.primary_key.columns],
+            )
+            add_row_hash_column(postgresql_client=postgresql_client, table=table)
         # Create the upsert statement
         if load_method == "insert":
             postgresql_client.insert(
                 data=df.to_dict(orient="records"), table=table, metadata=metadata
             )
         elif load_method == "upsert":
-            postgresql_client.upsert(
-                data=df.to_dict(orient="records"), table=table, metadata=metadata
+            batch_stats = postgresql_client.upsert(
+                data=df.to_dict(orient="records"),
+                table=table,
+                metadata=metadata,
+                chunk_size=chunk_size,
+                commit_per_chunk=commit_per_chunk,
             )
+            for batch_number, batch in enumerate(batch_stats, start=1):
+                print(
+                    f"Upserted batch {batch_number}: {batch['rows']} rows in {batch['seconds']:.3f}s"
+                )
+            log_load_counts(batch_stats)
         elif load_method == "overwrite":
             postgresql_client.overwrite(
                 data=df.to_dict(orient="records"), table=table, metadata=metadata
             )
+        elif load_method == "copy":
+            batch_stats = [
+                postgresql_client.copy_upsert(
+                    data=df.to_dict(orient="records"), table=table, metadata=metadata
+                )
+            ]
+            log_load_counts(batch_stats)
         else:
             raise Exception(
-                "Please specify a correct load method: [insert, upsert, overwrite]"
+                "Please specify a correct load method: [insert, upsert, overwrite, copy]"
             )
         print("Completed load")
 
+    return batch_stats
+
+
+def log_load_counts(batch_stats: list[dict]) -> None:
+    rows = sum(batch["rows"] for batch in batch_stats)
+    inserted = sum(batch["inserted"] for batch in batch_stats)
+    updated = sum(batch["updated"] for batch in batch_stats)
+    print(
+        f"Loaded {rows} rows: {inserted} inserted, {updated} updated, "
+        f"{rows - inserted - updated} unchanged"
+    )
+
+
+# load a stream of dataframes into postgres
+def load_stream(
+    dfs: Iterator[pd.DataFrame],
+    postgresql_client: PostgreSqlClient,
+    table: Table,
+    metadata: MetaData,
+    load_method,
+    chunk_size: int = 5000,
+    commit_per_chunk: bool = False,
+) -> int:
+    """
+    Load a stream of dataframes to a database, one chunk at a time.
+        Args:
+            dfs: dataframes to load
+            postgresql_client: postgresql client
+            table: sqlalchemy table
+            metadata: sqlalchemy metadata
+            load_method: supports one of: [insert, upsert, overwrite, copy]
+            chunk_size: maximum rows per upsert statement
+            commit_per_chunk: commit each upsert batch instead of one transaction
+        Returns:
+            distinct years loaded, empty if no rows were loaded
+    """
+    rows_loaded = 0
+    years_loaded = set()
+    for df in dfs:
+        if df.empty:
+            continue
+        load(
+            df=df,
+            postgresql_client=postgresql_client,
+            table=table,
+            metadata=metadata,
+            load_method=load_method,
+            chunk_size=chunk_size,
+            commit_per_chunk=commit_per_chunk,
+        )
+        rows_loaded += len(df)
+        years_loaded.update(int(year) for year in df["year"].unique())
+        if load_method == "overwrite":
+            load_method = "insert"  # only the first chunk replaces the table
+    print(f"Loaded {rows_loaded} rows")
+    return sorted(years_loaded)
+
 
 # do further transformation using jinja and partition - create an unemployment_ranked table
 def transform_sql(
-    table_name: str, postgresql_client: PostgreSqlClient, environment: Environment
+    table_name: str,
+    postgresql_client: PostgreSqlClient,
+    years: list[int] = None,
 ):
+    """
+    Builds the ranked table from the ranked.sql template without the table
+    ever being missing for readers.
 
-    transform_sql_template = environment.get_template(f"{table_name}.sql")
+        Args:
+            table_name: name of the ranked table, e.g. unemployment_ranked. The
+                source table and metric name are the table name without _ranked.
+            postgresql_client: postgresql client
+            years: if provided and the ranked table exists, only these years
+                are recomputed. Otherwise the whole table is rebuilt.
+    """
+    source_table_name = table_name.removesuffix("_ranked")
+    template_params = {
+        "table_name": table_name,
+        "source_table_name": source_table_name,
+        "metric_name": source_table_name,
+    }
 
-    exec_sql = f"""
-        drop table if exists {table_name};
-        create table {table_name} as (
-             {transform_sql_template.render()}
+    if years is None or not postgresql_client.table_exists(table_name):
+        # build into a shadow table and swap it in, readers see the old table until then
+        shadow_table_name = f"{table_name}_shadow"
+        postgresql_client.execute_sql(f"""
+            drop table if exists {shadow_table_name};
+            create table {shadow_table_name} as (
+                 {render_sql("ranked.sql", **template_params)}
+            )
+            """)
+        postgresql_client.execute_in_transaction(
+            [
+                f"drop table if exists {table_name}",
+                f"alter table {shadow_table_name} rename to {table_name}",
+            ]
         )
+        return
+
+    if not years:
+        print(f"No years loaded, {table_name} is up to date")
+        return
+
+    # every ranked column is partitioned by year, except the region average
+    # which spans all years and is refreshed for the affected regions
+    years = [int(year) for year in years]
+    year_list = ", ".join(str(year) for year in years)
+    postgresql_client.execute_in_transaction(
+        [
+            f"delete from {table_name} where year in ({year_list})",
+            f"insert into {table_name} {render_sql('ranked.sql', years=years, **template_params)}",
+            render_sql("ranked_region_avg.sql", years=years, **template_params),
+        ]
+    )
+    print(f"Recomputed {table_name} for years {year_list}")
+
+
+# create the ranked table rows in pandas instead of sql window functions
+def transform_ranked(
+    df: pd.DataFrame, table_name: str, postgresql_client: PostgreSqlClient
+):
     """
-    postgresql_client.execute_sql(exec_sql)
+    Recomputes the years of the ranked table that are in `df` with the pandas
+    ranking engine and replaces them in a single transaction. The region
+    average spans all years, so it is refreshed in sql for the affected regions.
+    Falls back to transform_sql if the ranked table does not exist yet.
+
+        Args:
+            df: transformed data holding every row of the years it covers
+            table_name: name of the ranked table, e.g. unemployment_ranked
+            postgresql_client: postgresql client
+    """
+    if df.empty:
+        print(f"No years loaded, {table_name} is up to date")
+        return
+    if not postgresql_client.table_exists(table_name):
+        transform_sql(table_name=table_name, postgresql_client=postgresql_client)
+        return
+
+    source_table_name = table_name.removesuffix("_ranked")
+    years = sorted(int(year) for year in df["year"].unique())
+    df_ranked = rank_indicator(df, metric_name=source_table_name)
+    table, _ = get_ranked_table(table_name=table_name, metric_name=source_table_name)
+
+    statements = [table.delete().where(table.c.year.in_(years))]
+    rows_per_statement = PostgreSqlClient.MAX_PARAMETERS // len(table.columns)
+    for batch in iter_batches(df_ranked.to_dict(orient="records"), rows_per_statement):
+        statements.append(postgresql.insert(table).values(batch))
+    statements.append(
+        render_sql(
+            "ranked_region_avg.sql",
+            table_name=table_name,
+            source_table_name=source_table_name,
+            metric_name=source_table_name,
+            years=years,
+        )
+    )
+    postgresql_client.execute_in_transaction(statements)
+    print(f"Recomputed {table_name} for years {years} in pandas")
@@ -1,7 +1,24 @@
-from etl_project.connectors.postgresql import PostgreSqlClient
+import atexit
+import queue
+import threading
+from collections import deque
 from datetime import datetime, timezone
-from sqlalchemy import Table, Column, Integer, String, MetaData, JSON
-from sqlalchemy import insert, select, func
+from etl_project.connectors.postgresql import PostgreSqlClient
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Identity,
+    Index,
+    MetaData,
+    Sequence,
+    String,
+    Table,
+    Text,
+    insert,
+    text,
+)
+from sqlalchemy.dialects.postgresql import JSONB
 
 
 class MetaDataLoggingStatus:
@@ -12,63 +29,201 @@ class MetaDataLoggingStatus:
     RUN_FAILURE = "fail"
 
 
+def get_run_log_table(log_table_name: str) -> tuple[Table, Sequence, MetaData]:
+    """
+    Returns the append only run log table and the sequence of its run ids.
+
+    Each run appends one row per status. Lookups by pipeline and time use the
+    btree index, time range scans over the whole table use the small BRIN
+    index, which suits rows appended in time order.
+    """
+    metadata = MetaData()
+    run_id_sequence = Sequence(f"{log_table_name}_run_id_seq", metadata=metadata)
+    table = Table(
+        log_table_name,
+        metadata,
+        Column("log_id", BigInteger, Identity(), primary_key=True),
+        Column("run_id", BigInteger, nullable=False),
+        Column("pipeline_name", String, nullable=False),
+        Column("status", String, nullable=False),
+        Column("logged_at", DateTime(timezone=True), nullable=False),
+        Column("config", JSONB(none_as_null=True)),
+        Column("logs", Text),
+        Column("metrics", JSONB(none_as_null=True)),
+        Index(
+            f"{log_table_name}_pipeline_name_logged_at_idx",
+            "pipeline_name",
+            "logged_at",
+        ),
+        Index(f"{log_table_name}_run_id_idx", "run_id"),
+        Index(
+            f"{log_table_name}_logged_at_brin_idx",
+            "logged_at",
+            postgresql_using="brin",
+        ),
+    )
+    return table, run_id_sequence, metadata
+
+
+class RunLogWriter:
+    """
+    Writes run log rows from a background thread, so pipelines never wait on
+    metadata inserts. Rows are inserted in batches of at most `batch_size`, at
+    least every `flush_seconds`. Rows of failed inserts are retried on the next
+    flush, keeping at most `max_pending` rows.
+    """
+
+    def __init__(
+        self,
+        postgresql_client: PostgreSqlClient,
+        log_table_name: str = "pipeline_run_log",
+        batch_size: int = 500,
+        flush_seconds: float = 1.0,
+        max_pending: int = 10000,
+    ):
+        self.postgresql_client = postgresql_client
+        self.table, self.run_id_sequence, self.metadata = get_run_log_table(
+            log_table_name
+        )
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self._queue = queue.Queue()
+        self._pending = deque(maxlen=max_pending)
+        self._table_created = False
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"{log_table_name}_writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self, run_logger: "MetaDataLogging", row: dict) -> None:
+        """Queues a row of a run, returning immediately."""
+        self._queue.put((run_logger, row))
+
+    def flush(self) -> None:
+        """Blocks until every row queued so far is written or has failed."""
+        self._queue.join()
+
+    def close(self) -> None:
+        """Writes the remaining rows and stops the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            items = []
+            try:
+                items.append(self._queue.get(timeout=self.flush_seconds))
+                while len(items) < self.batch_size:
+                    items.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if None in items:
+                stopping = True
+            self._pending.extend(item for item in items if item is not None)
+            self._write_pending()
+            for _ in items:
+                self._queue.task_done()
+
+    def _write_pending(self) -> None:
+        if not self._pending:
+            return
+        batch = list(self._pending)
+        try:
+            if not self._table_created:
+                self.postgresql_client.create_table(metadata=self.metadata)
+                # log tables created before stage metrics were recorded
+                self.postgresql_client.execute_sql(
+                    f"alter table {self.table.name} add column if not exists metrics jsonb"
+                )
+                self._table_created = True
+            with self.postgresql_client.engine.begin() as connection:
+                # runs get their id when their first row is written
+                new_runs = list(
+                    {id(run): run for run, _ in batch if run.run_id is None}.values()
+                )
+                if new_runs:
+                    run_ids = connection.execute(
+                        text(
+                            f"select nextval('{self.run_id_sequence.name}') "
+                            "from generate_series(1, :run_count)"
+                        ),
+                        {"run_count": len(new_runs)},
+                    ).scalars()
+                    for run, run_id in zip(new_runs, run_ids):
+                        run.run_id = run_id
+                connection.execute(
+                    insert(self.table),
+                    [{**row, "run_id": run.run_id} for run, row in batch],
+                )
+            self._pending.clear()
+        except Exception as e:
+            print(f"Failed to write {len(batch)} run log rows, retrying later: {e}")
+
+
+_run_log_writers: dict[tuple[str, str], RunLogWriter] = {}
+_run_log_writers_lock = threading.Lock()
+
+
+def get_run_log_writer(
+    postgresql_client: PostgreSqlClient, log_table_name: str
+) -> RunLogWriter:
+    """Returns the writer of a log table, shared by every run of the process."""
+    key = (str(postgresql_client.engine.url), log_table_name)
+    with _run_log_writers_lock:
+        if key not in _run_log_writers:
+            _run_log_writers[key] = RunLogWriter(
+                postgresql_client=postgresql_client, log_table_name=log_table_name
+            )
+        return _run_log_writers[key]
+
+
 class MetaDataLogging:
     def __init__(
         self,
         pipeline_name: str,
         postgresql_client: PostgreSqlClient,
         config: dict = {},
-        log_table_name: str = "pipeline_logs",
+        log_table_name: str = "pipeline_run_log",
     ):
         self.pipeline_name = pipeline_name
         self.log_table_name = log_table_name
         self.postgresql_client = postgresql_client
         self.config = config
-        self.metadata = MetaData()
-        self.table = Table(
-            self.log_table_name,
-            self.metadata,
-            Column("pipeline_name", String, primary_key=True),
-            Column("run_id", Integer, primary_key=True),
-            Column("timestamp", String, primary_key=True),
-            Column("status", String, primary_key=True),
-            Column("config", JSON),
-            Column("logs", String),
+        # assigned from the run id sequence when the first row is written
+        self.run_id: int = None
+        self.writer = get_run_log_writer(
+            postgresql_client=postgresql_client, log_table_name=log_table_name
         )
-        self.run_id: int = self._get_run_id()
-
-    def _create_log_table(self) -> None:
-        """Create log table if it does not exist."""
-        self.postgresql_client.create_table(metadata=self.metadata)
-
-    def _get_run_id(self):
-        """Gets the next run id. Sets run id to 1 if no run id exists."""
-        self._create_log_table()
-        run_id = self.postgresql_client.engine.execute(
-            select(func.max(self.table.c.run_id)).where(
-                self.table.c.pipeline_name == self.pipeline_name
-            )
-        ).first()[0]
-        if run_id is None:
-            return 1
-        else:
-            return run_id + 1
 
     def log(
         self,
         status: MetaDataLoggingStatus = MetaDataLoggingStatus.RUN_START,
         timestamp: datetime = None,
         logs: str = None,
+        metrics: list[dict] = None,
     ) -> None:
-        """Writes pipeline metadata log to a database"""
+        """
+        Queues a pipeline metadata log row, which is written to the database
+        in the background. The config is only stored with the start row.
+        `metrics` are the stage metrics of the run, see `PipelineMetrics`.
+        """
         if timestamp is None:
-            timestamp = datetime.now()
-        insert_statement = insert(self.table).values(
-            pipeline_name=self.pipeline_name,
-            timestamp=timestamp,
-            run_id=self.run_id,
-            status=status,
-            config=self.config,
-            logs=logs,
+            timestamp = datetime.now(timezone.utc)
+        self.writer.write(
+            run_logger=self,
+            row={
+                "pipeline_name": self.pipeline_name,
+                "status": status,
+                "logged_at": timestamp,
+                "config": (
+                    self.config if status == MetaDataLoggingStatus.RUN_START else None
+                ),
+                "logs": logs,
+                "metrics": metrics,
+            },
         )
-        self.postgresql_client.engine.execute(insert_statement)
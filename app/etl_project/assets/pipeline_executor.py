@@ -0,0 +1,122 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+from etl_project.assets.metadata_logging import MetaDataLoggingStatus
+
+
+class PipelineResult:
+    """Outcome of a single pipeline run"""
+
+    def __init__(self, name: str, status: str, error: BaseException = None):
+        self.name = name
+        self.status = status
+        self.error = error
+
+    def __repr__(self) -> str:
+        return f"PipelineResult(name={self.name!r}, status={self.status!r}, error={self.error!r})"
+
+
+def run_in_parallel(
+    pipelines: dict[str, Callable[[], str]], max_workers: int = 4
+) -> dict[str, PipelineResult]:
+    """
+    Runs pipelines concurrently and collects the result of each one.
+
+        Args:
+            pipelines: mapping of name to a callable that runs the pipeline and
+                returns its status
+            max_workers: maximum number of pipelines running at the same time
+
+        Returns:
+            mapping of name to the pipeline result, in the order of `pipelines`.
+            A pipeline raising an exception does not stop the others, the
+            exception is stored on its result instead.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            name: executor.submit(run_callable)
+            for name, run_callable in pipelines.items()
+        }
+
+    results = {}
+    for name, future in futures.items():
+        error = future.exception()
+        if error is None:
+            results[name] = PipelineResult(name=name, status=future.result())
+        else:
+            results[name] = PipelineResult(
+                name=name, status=MetaDataLoggingStatus.RUN_FAILURE, error=error
+            )
+    return results
+
+
+class ResourceLimits:
+    """
+    Bounds the pipeline stages running at the same time on one event loop,
+    per resource they mostly wait on: "api" for World Bank requests, "db" for
+    postgres reads and writes, "cpu" for pandas transforms. Stages of other
+    resources don't wait on each other, so the api requests of one indicator
+    overlap the database writes of another.
+
+    `max_api` caps the api limit, e.g. so the requests of every api stage fit
+    the HTTP connection pool.
+
+    The semaphores are created on first use, by the running event loop, so
+    limits must not be shared between event loops.
+    """
+
+    def __init__(self, api: int = 8, db: int = 4, cpu: int = 2, max_api: int = None):
+        if max_api is not None and api > max_api:
+            print(f"Limiting api stages to {max_api} instead of {api}")
+            api = max_api
+        self.limits = {"api": api, "db": db, "cpu": cpu}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @property
+    def thread_count(self) -> int:
+        """Worker threads needed to run every stage allowed at the same time."""
+        return sum(self.limits.values())
+
+    @asynccontextmanager
+    async def acquire(self, resource: str) -> AsyncIterator[None]:
+        """Waits for a free slot of `resource`, holding it until the block ends."""
+        if resource not in self._semaphores:
+            self._semaphores[resource] = asyncio.Semaphore(self.limits[resource])
+        async with self._semaphores[resource]:
+            yield
+
+    async def run(self, resource: str, func: Callable, *args, **kwargs):
+        """Runs a blocking function on a worker thread, within a slot of `resource`."""
+        async with self.acquire(resource):
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def run_concurrently(
+    pipelines: dict[str, Callable[[], Awaitable[str]]],
+) -> dict[str, PipelineResult]:
+    """
+    Runs pipeline coroutines concurrently on the running event loop, like
+    `run_in_parallel` does with threads. Concurrency is bounded by the
+    `ResourceLimits` of the pipelines rather than a number of workers.
+
+        Args:
+            pipelines: mapping of name to a coroutine function that runs the
+                pipeline and returns its status
+
+        Returns:
+            mapping of name to the pipeline result, in the order of `pipelines`
+    """
+    outcomes = await asyncio.gather(
+        *(run_coroutine() for run_coroutine in pipelines.values()),
+        return_exceptions=True,
+    )
+    results = {}
+    for name, outcome in zip(pipelines, outcomes):
+        if isinstance(outcome, BaseException):
+            results[name] = PipelineResult(
+                name=name, status=MetaDataLoggingStatus.RUN_FAILURE, error=outcome
+            )
+        else:
+            results[name] = PipelineResult(name=name, status=outcome)
+    return results
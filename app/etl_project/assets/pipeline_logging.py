@@ -1,14 +1,112 @@
+import itertools
 import logging
+import threading
 import time
+import zlib
+from collections import deque
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the formatted log lines of a run in memory, dropping the oldest
+    lines once more than `max_bytes` are kept. With `compress`, lines are
+    zlib compressed in blocks of about `block_bytes`, so the same memory holds
+    a longer run.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 1048576,
+        compress: bool = False,
+        block_bytes: int = 65536,
+    ):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.compress = compress
+        # blocks stay well below the limit, so dropping one keeps most lines
+        self.block_bytes = min(block_bytes, max_bytes // 4) if compress else 0
+        # (data, line count) of each block, compressed bytes or a str line
+        self._blocks = deque()
+        self._block_bytes = 0
+        # lines not compressed yet
+        self._lines = []
+        self._lines_bytes = 0
+        self.dropped_lines = 0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            line = self.format(record) + "\n"
+        except Exception:
+            self.handleError(record)
+            return
+        # handle() already holds the handler lock
+        self._lines.append(line)
+        self._lines_bytes += len(line)
+        if self._lines_bytes >= self.block_bytes:
+            self._seal_lines()
+        self._drop_oldest()
+
+    def _seal_lines(self) -> None:
+        if self.compress:
+            data = zlib.compress("".join(self._lines).encode())
+            self._blocks.append((data, len(self._lines)))
+            self._block_bytes += len(data)
+        else:
+            for line in self._lines:
+                self._blocks.append((line, 1))
+                self._block_bytes += len(line)
+        self._lines = []
+        self._lines_bytes = 0
+
+    def _drop_oldest(self) -> None:
+        while self._blocks and self._block_bytes + self._lines_bytes > self.max_bytes:
+            data, line_count = self._blocks.popleft()
+            self._block_bytes -= len(data)
+            self.dropped_lines += line_count
+
+    def get_logs(self) -> str:
+        """Returns the kept lines, noting how many earlier lines were dropped."""
+        with self.lock:
+            blocks = list(self._blocks)
+            lines = list(self._lines)
+            dropped_lines = self.dropped_lines
+        parts = (
+            [f"... {dropped_lines} earlier lines dropped\n"] if dropped_lines else []
+        )
+        for data, _ in blocks:
+            parts.append(zlib.decompress(data).decode() if self.compress else data)
+        parts.extend(lines)
+        return "".join(parts)
+
+
+_run_numbers = itertools.count(1)
+_run_numbers_lock = threading.Lock()
 
 
 class PipelineLogging:
-    def __init__(self, pipeline_name: str, log_folder_path: str):
+    """
+    Logging of one pipeline run, to the console, a log file and an in-memory
+    ring buffer that `get_logs` reads from.
+
+    Every run gets its own logger, outside of the `logging` registry, so
+    concurrent runs of the same pipeline never share handlers and finished runs
+    are garbage collected. Call `close` when the run is done.
+    """
+
+    def __init__(
+        self,
+        pipeline_name: str,
+        log_folder_path: str,
+        max_buffer_bytes: int = 1048576,
+        compress: bool = False,
+    ):
         self.pipeline_name = pipeline_name
         self.log_folder_path = log_folder_path
 
         # Initialize logger
-        logger = logging.getLogger(pipeline_name)
+        with _run_numbers_lock:
+            run_number = next(_run_numbers)
+        logger = logging.Logger(f"{pipeline_name}.{run_number}")
         logger.setLevel(logging.INFO)
 
         # Create log file path
@@ -24,6 +122,11 @@ class PipelineLogging:
         stream_handler = logging.StreamHandler()
         stream_handler.setLevel(logging.INFO)
 
+        self.buffer_handler = RingBufferHandler(
+            max_bytes=max_buffer_bytes, compress=compress
+        )
+        self.buffer_handler.setLevel(logging.INFO)
+
         # Create formatters and add them to the handlers
         formatter = logging.Formatter(
             "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -31,20 +134,28 @@ class PipelineLogging:
 
         file_handler.setFormatter(formatter)
         stream_handler.setFormatter(formatter)
+        self.buffer_handler.setFormatter(formatter)
 
         # Add handlers to the logger
         logger.addHandler(file_handler)
         logger.addHandler(stream_handler)
+        logger.addHandler(self.buffer_handler)
 
         self.logger = logger
 
     def get_logs(self) -> str:
-        with open(self.file_path, "r") as file:
-            return "".join(file.readlines())
+        """Returns the logs of this run, without reading the log file."""
+        return self.buffer_handler.get_logs()
+
+    def close(self) -> None:
+        """Closes and removes the handlers, the logs stay readable."""
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+            handler.close()
 
 
 # Example usage:
-# logger, log_file = setup_pipeline_logging("pipeline_name", "/path/to/logs")
-# logger.info("This is an info log message.")
-# logs = get_logs(log_file)
-# print(logs)
+# pipeline_logging = PipelineLogging("pipeline_name", "/path/to/logs")
+# pipeline_logging.logger.info("This is an info log message.")
+# logs = pipeline_logging.get_logs()
+# pipeline_logging.close()
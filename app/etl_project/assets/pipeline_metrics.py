@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from etl_project.connectors.world_bank_api import track_requests
+
+try:
+    import resource
+except ImportError:  # not available on windows
+    resource = None
+
+
+def get_peak_rss_bytes() -> int:
+    """Returns the peak resident set size of the process so far."""
+    if resource is None:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macos reports bytes, linux kilobytes
+    return peak_rss if sys.platform == "darwin" else peak_rss * 1024
+
+
+def get_rss_bytes() -> int:
+    """Returns the current resident set size of the process, None if unknown."""
+    try:
+        with open("/proc/self/statm") as file:
+            resident_pages = int(file.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return resident_pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class RssSampler:
+    """
+    Samples the resident set size of the process every `interval_seconds` in a
+    background thread, keeping the peak since `start`.
+    """
+
+    def __init__(self, interval_seconds: float = 0.05):
+        self.interval_seconds = interval_seconds
+        self.start_bytes: int = None
+        self.peak_bytes: int = None
+        self._stopped = threading.Event()
+        self._thread: threading.Thread = None
+
+    def _sample(self) -> None:
+        rss = get_rss_bytes()
+        if rss is not None:
+            self.peak_bytes = max(self.peak_bytes or 0, rss)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            self._sample()
+
+    def start(self) -> None:
+        self.start_bytes = get_rss_bytes()
+        self.peak_bytes = self.start_bytes
+        if self.start_bytes is None:
+            return  # no /proc, e.g. macos
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            # the lifetime peak of the process is the best estimate left
+            self.peak_bytes = get_peak_rss_bytes()
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._sample()
+
+
+class StageMetrics:
+    """Measurements of one stage of a pipeline run"""
+
+    def __init__(self, pipeline_name: str, wb_indicator: str, stage: str):
+        self.pipeline_name = pipeline_name
+        self.wb_indicator = wb_indicator
+        self.stage = stage
+        self.seconds: float = None
+        self.api_requests = 0
+        self.api_bytes = 0
+        self.rows_in: int = None
+        self.rows_out: int = None
+        # resident set size of the whole process, which runs indicators
+        # concurrently, at the start of the stage and at its peak during it
+        self.start_rss_bytes: int = None
+        self.peak_rss_bytes: int = None
+
+    def to_dict(self) -> dict:
+        return {
+            "wb_indicator": self.wb_indicator,
+            "stage": self.stage,
+            "seconds": self.seconds,
+            "api_requests": self.api_requests,
+            "api_bytes": self.api_bytes,
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "start_rss_bytes": self.start_rss_bytes,
+            "peak_rss_bytes": self.peak_rss_bytes,
+        }
+
+
+class PipelineMetrics:
+    """
+    Collects the metrics of each stage of a pipeline run, e.g.
+
+        with metrics.stage("transform", rows_in=len(df)) as stage:
+            df_transformed = transform(df, ...)
+            stage.rows_out = len(df_transformed)
+    """
+
+    def __init__(self, pipeline_name: str, wb_indicator: str):
+        self.pipeline_name = pipeline_name
+        self.wb_indicator = wb_indicator
+        self.stages: list[StageMetrics] = []
+
+    @contextmanager
+    def stage(self, stage: str, rows_in: int = None) -> Iterator[StageMetrics]:
+        """
+        Measures the wall time, World Bank requests and peak memory of a stage.
+        The stage is recorded even if it fails.
+        """
+        stage_metrics = StageMetrics(
+            pipeline_name=self.pipeline_name,
+            wb_indicator=self.wb_indicator,
+            stage=stage,
+        )
+        stage_metrics.rows_in = rows_in
+        self.stages.append(stage_metrics)
+        rss_sampler = RssSampler()
+        rss_sampler.start()
+        start_time = time.perf_counter()
+        try:
+            with track_requests() as request_stats:
+                yield stage_metrics
+        finally:
+            stage_metrics.seconds = time.perf_counter() - start_time
+            stage_metrics.api_requests = request_stats.requests
+            stage_metrics.api_bytes = request_stats.bytes
+            rss_sampler.stop()
+            stage_metrics.start_rss_bytes = rss_sampler.start_bytes
+            stage_metrics.peak_rss_bytes = rss_sampler.peak_bytes
+
+    def to_dicts(self) -> list[dict]:
+        return [stage_metrics.to_dict() for stage_metrics in self.stages]
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{stage_metrics.stage} {stage_metrics.seconds:.3f}s"
+            for stage_metrics in self.stages
+        )
+
+
+# latest metrics of each pipeline, indicator and stage, for the prometheus file
+_latest_stages: dict[tuple[str, str, str], StageMetrics] = {}
+_latest_stages_lock = threading.Lock()
+
+PROMETHEUS_METRICS = {
+    "seconds": "Wall time of the stage in seconds",
+    "api_requests": "World Bank API requests sent by the stage",
+    "api_bytes": "Bytes downloaded from the World Bank API by the stage",
+    "rows_in": "Rows the stage received",
+    "rows_out": "Rows the stage produced",
+    "start_rss_bytes": "Resident set size of the process at the start of the stage",
+    "peak_rss_bytes": "Peak resident set size of the process during the stage",
+}
+
+
+def write_prometheus_file(metrics: PipelineMetrics, file_path: str) -> None:
+    """
+    Writes the latest metrics of every stage run by the process in the
+    Prometheus text format, e.g. for the node exporter textfile collector.
+    The file is replaced atomically, so scrapes never read a partial file.
+    """
+    with _latest_stages_lock:
+        for stage_metrics in metrics.stages:
+            key = (
+                stage_metrics.pipeline_name,
+                stage_metrics.wb_indicator,
+                stage_metrics.stage,
+            )
+            _latest_stages[key] = stage_metrics
+
+        lines = []
+        for metric, description in PROMETHEUS_METRICS.items():
+            metric_name = f"pipeline_stage_{metric}"
+            lines.append(f"# HELP {metric_name} {description}")
+            lines.append(f"# TYPE {metric_name} gauge")
+            for (pipeline_name, wb_indicator, stage), stage_metrics in sorted(
+                _latest_stages.items()
+            ):
+                value = getattr(stage_metrics, metric)
+                if value is None:
+                    continue
+                lines.append(
+                    f'{metric_name}{{pipeline="{pipeline_name}",'
+                    f'wb_indicator="{wb_indicator}",stage="{stage}"}} {value}'
+                )
+
+        temp_file_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_file_path, "w") as file:
+            file.write("\n".join(lines) + "\n")
+        os.replace(temp_file_path, file_path)
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+import schedule
+
+
+class PipelineScheduler:
+    """
+    Runs pipeline jobs on interval or time of day schedules.
+
+    Jobs are run on a thread pool so that a slow job does not delay the others,
+    and a job is skipped if its previous run is still in progress. With
+    `run_forever_async`, coroutine jobs run as tasks of the event loop instead.
+
+    Each job is configured with a schedule dict that supports one of:
+        interval_seconds: 3600            # every hour
+        at: "02:00"                       # every day at 02:00
+        every: "monday"                   # every monday at midnight, or with `at`
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.scheduler = schedule.Scheduler()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._running_jobs = set()
+        self._lock = threading.Lock()
+        self._tasks: set[asyncio.Task] = set()
+
+    def _build_job(self, schedule_config: dict) -> schedule.Job:
+        if "interval_seconds" in schedule_config:
+            return self.scheduler.every(schedule_config["interval_seconds"]).seconds
+        if "at" in schedule_config or "every" in schedule_config:
+            job = getattr(
+                self.scheduler.every(), schedule_config.get("every", "day")
+            )  # e.g. every().day, every().monday
+            return job.at(schedule_config.get("at", "00:00"))
+        raise Exception(
+            f"Please specify one of [interval_seconds, at, every] in the schedule: {schedule_config}"
+        )
+
+    def _run_job(self, name: str, job_func: Callable) -> None:
+        try:
+            job_func()
+        except Exception as e:
+            print(f"Scheduled job {name} failed: {e}")
+        finally:
+            with self._lock:
+                self._running_jobs.discard(name)
+
+    async def _run_job_async(self, name: str, job_func: Callable) -> None:
+        try:
+            await job_func()
+        except Exception as e:
+            print(f"Scheduled job {name} failed: {e}")
+        finally:
+            with self._lock:
+                self._running_jobs.discard(name)
+
+    def _submit_job(self, name: str, job_func: Callable) -> None:
+        """Starts the job unless its previous run has not finished yet."""
+        with self._lock:
+            if name in self._running_jobs:
+                print(f"Skipping scheduled job {name}, previous run is still running")
+                return
+            self._running_jobs.add(name)
+        if asyncio.iscoroutinefunction(job_func):
+            # only called from run_forever_async, on the event loop
+            task = asyncio.get_running_loop().create_task(
+                self._run_job_async(name, job_func)
+            )
+            self._tasks.add(task)  # the loop only keeps weak references
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self.executor.submit(self._run_job, name, job_func)
+
+    def add_job(self, name: str, job_func: Callable, schedule_config: dict) -> None:
+        """Schedules `job_func` under `name` according to `schedule_config`."""
+        self._build_job(schedule_config).do(self._submit_job, name, job_func).tag(name)
+
+    def run_all(self) -> None:
+        """Starts every job now, e.g. to catch up on start up."""
+        for job in self.scheduler.get_jobs():
+            job.run()
+
+    def run_forever(self, poll_seconds: float = 60, run_on_start: bool = True):
+        """Runs jobs as they become due, sleeping until the next one."""
+        if run_on_start:
+            self.run_all()
+        while True:
+            self.scheduler.run_pending()
+            idle_seconds = self.scheduler.idle_seconds
+            if idle_seconds is None:  # no jobs scheduled
+                idle_seconds = poll_seconds
+            time.sleep(max(0, min(idle_seconds, poll_seconds)))
+
+    async def run_forever_async(
+        self, poll_seconds: float = 60, run_on_start: bool = True
+    ):
+        """
+        Like `run_forever`, on the running event loop, so that coroutine jobs
+        share it and the loop keeps running them while waiting for the next job.
+        """
+        if run_on_start:
+            self.run_all()
+        while True:
+            self.scheduler.run_pending()
+            idle_seconds = self.scheduler.idle_seconds
+            if idle_seconds is None:  # no jobs scheduled
+                idle_seconds = poll_seconds
+            await asyncio.sleep(max(0, min(idle_seconds, poll_seconds)))
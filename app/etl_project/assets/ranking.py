@@ -0,0 +1,59 @@
+import pandas as pd
+from sqlalchemy import BigInteger, Column, Float, Integer, MetaData, String, Table
+
+
+def rank_indicator(df: pd.DataFrame, metric_name: str) -> pd.DataFrame:
+    """
+    Computes the columns of the ranked.sql template in pandas.
+
+        Args:
+            df: transformed indicator data with year, country_code,
+                country_name, region and value columns
+            metric_name: name of the metric, e.g. unemployment
+
+        Returns:
+            the same rows and columns as ranked.sql produces for `df`
+    """
+    # same filter as `where region <> 'nan'`, which also drops null regions
+    df_ranked = df.loc[
+        df["region"].notna() & (df["region"].astype(str) != "nan"),
+        ["year", "country_code", "country_name", "region", "value"],
+    ].astype({"region": "object", "country_code": "object", "country_name": "object"})
+    df_ranked = df_ranked.rename(columns={"value": metric_name})
+
+    values = df_ranked[metric_name]
+    by_year = values.groupby(df_ranked["year"])
+    by_year_region = values.groupby([df_ranked["year"], df_ranked["region"]])
+
+    df_ranked[f"avg_{metric_name}_by_year"] = by_year.transform("mean")
+    df_ranked[f"avg_{metric_name}_by_region"] = values.groupby(
+        df_ranked["region"]
+    ).transform("mean")
+    # method="min" gives ties the same rank and skips the next ones, like sql rank()
+    df_ranked[f"rank_{metric_name}_by_year"] = by_year.rank(
+        method="min", ascending=False
+    ).astype("int64")
+    df_ranked[f"rank_{metric_name}_by_region"] = by_year_region.rank(
+        method="min", ascending=False
+    ).astype("int64")
+
+    return df_ranked.sort_values(["year", "country_code"]).reset_index(drop=True)
+
+
+def get_ranked_table(table_name: str, metric_name: str) -> tuple[Table, MetaData]:
+    """Returns the sqlalchemy table matching the columns of ranked.sql"""
+    metadata = MetaData()
+    table = Table(
+        table_name,
+        metadata,
+        Column("year", Integer),
+        Column("country_code", String),
+        Column("country_name", String),
+        Column("region", String),
+        Column(metric_name, Float),
+        Column(f"avg_{metric_name}_by_year", Float),
+        Column(f"avg_{metric_name}_by_region", Float),
+        Column(f"rank_{metric_name}_by_year", BigInteger),
+        Column(f"rank_{metric_name}_by_region", BigInteger),
+    )
+    return table, metadata
@@ -0,0 +1,50 @@
+import os
+import threading
+import pandas as pd
+
+
+class RegionClassification:
+    """
+    The World Bank country classification, indexed by country code.
+
+    Each attribute is a categorical Series indexed by country code, so looking
+    up a column of country codes is a vectorized `map`.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.modified_time = os.stat(file_path).st_mtime_ns
+
+        df = pd.read_csv(
+            file_path, usecols=["Code", "Region", "Income group", "Lending category"]
+        )  # "data/CLASS_CSV.csv"
+        df = df.dropna(subset=["Code"]).set_index("Code")
+
+        self.region = df["Region"].astype("category")
+        self.income_group = df["Income group"].astype("category")
+        self.lending_category = df["Lending category"].astype("category")
+
+    def is_stale(self) -> bool:
+        """Checks if the file changed since it was loaded."""
+        return os.stat(self.file_path).st_mtime_ns != self.modified_time
+
+    def contains(self, country_codes: pd.Series) -> pd.Series:
+        """Returns a mask of the country codes present in the classification."""
+        return country_codes.isin(self.region.index)
+
+
+_region_classifications: dict[str, RegionClassification] = {}
+_region_classifications_lock = threading.Lock()
+
+
+def get_region_classification(file_path: str) -> RegionClassification:
+    """
+    Returns the classification of a file, loading it on first use and again
+    whenever the file is modified.
+    """
+    with _region_classifications_lock:
+        region_classification = _region_classifications.get(file_path)
+        if region_classification is None or region_classification.is_stale():
+            region_classification = RegionClassification(file_path)
+            _region_classifications[file_path] = region_classification
+        return region_classification
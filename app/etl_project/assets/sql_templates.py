@@ -0,0 +1,55 @@
+import threading
+from functools import lru_cache
+from pathlib import Path
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+TRANSFORM_SQL_PATH = Path(__file__).resolve().parent.parent / "sql" / "transform"
+
+# templates don't change while the pipeline runs, so they are compiled once per
+# process and the compiled bytecode is also cached on disk across processes
+_environment = Environment(
+    loader=FileSystemLoader(TRANSFORM_SQL_PATH),
+    bytecode_cache=FileSystemBytecodeCache(),
+    auto_reload=False,
+    cache_size=-1,  # never evict compiled templates
+)
+_templates: dict[str, Template] = {}
+_templates_lock = threading.Lock()
+
+
+def load_templates() -> dict[str, Template]:
+    """Compiles every template under sql/transform, on the first call only."""
+    with _templates_lock:
+        if not _templates:
+            for template_name in _environment.list_templates(extensions=["sql"]):
+                _templates[template_name] = _environment.get_template(template_name)
+        return _templates
+
+
+def get_template(template_name: str) -> Template:
+    return load_templates()[template_name]
+
+
+@lru_cache(maxsize=256)
+def _render_sql(template_name: str, params: tuple) -> str:
+    return get_template(template_name).render(**dict(params))
+
+
+def _to_hashable(value):
+    if isinstance(value, set):
+        return tuple(sorted(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def render_sql(template_name: str, **params) -> str:
+    """
+    Renders a sql template with parameters such as table and metric names.
+    Renders are cached, so list parameters are converted to tuples to be
+    hashable.
+    """
+    hashable_params = tuple(
+        sorted((name, _to_hashable(value)) for name, value in params.items())
+    )
+    return _render_sql(template_name, hashable_params)
@@ -0,0 +1,76 @@
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, select
+from sqlalchemy.dialects import postgresql
+from etl_project.connectors.postgresql import PostgreSqlClient
+
+_created_tables: set[tuple[str, str]] = set()
+_created_tables_lock = threading.Lock()
+
+
+class WatermarkStore:
+    """
+    Incremental extract state of each wb indicator: the last year extracted,
+    the World Bank `lastupdated` date of the data when it was extracted, and
+    the number of past years refetched when the World Bank revises its data.
+    """
+
+    def __init__(
+        self,
+        postgresql_client: PostgreSqlClient,
+        table_name: str = "extract_watermarks",
+    ):
+        self.postgresql_client = postgresql_client
+        self.metadata = MetaData()
+        self.table = Table(
+            table_name,
+            self.metadata,
+            Column("wb_indicator", String, primary_key=True),
+            Column("last_year", Integer),
+            Column("last_updated", String),
+            Column("lookback_years", Integer),
+            Column("updated_at", DateTime(timezone=True)),
+        )
+
+    def _create_table(self) -> None:
+        """Creates the watermark table, once per database and process."""
+        key = (str(self.postgresql_client.engine.url), self.table.name)
+        with _created_tables_lock:
+            if key not in _created_tables:
+                self.postgresql_client.create_table(metadata=self.metadata)
+                _created_tables.add(key)
+
+    def get(self, wb_indicator: str) -> dict:
+        """Returns the watermark of an indicator, or None if it has none yet."""
+        self._create_table()
+        row = self.postgresql_client.engine.execute(
+            select(self.table).where(self.table.c.wb_indicator == wb_indicator)
+        ).first()
+        return dict(row) if row is not None else None
+
+    def save(
+        self,
+        wb_indicator: str,
+        last_year: int,
+        last_updated: str,
+        lookback_years: int,
+    ) -> None:
+        """Writes the watermark of an indicator, replacing the previous one."""
+        self._create_table()
+        insert_statement = postgresql.insert(self.table).values(
+            wb_indicator=wb_indicator,
+            last_year=last_year,
+            last_updated=last_updated,
+            lookback_years=lookback_years,
+            updated_at=datetime.now(timezone.utc),
+        )
+        self.postgresql_client.engine.execute(
+            insert_statement.on_conflict_do_update(
+                index_elements=["wb_indicator"],
+                set_={
+                    c.key: c
+                    for c in insert_statement.excluded
+                    if c.key != "wb_indicator"
+                },
+            )
+        )
@@ -1,35 +1,412 @@
-import requests
+import contextvars
+import math
 import pandas as pd
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, Union
+from etl_project.connectors.world_bank_api import (
+    WorldBankApiClient,
+    get_world_bank_api_client,
+)
+
+# pages are halved when they fail, down to this many rows
+MIN_PER_PAGE = 32
+# bounds of the page size picked in adaptive mode
+MIN_ADAPTIVE_PER_PAGE = 1024
+MAX_ADAPTIVE_PER_PAGE = 16384
+# pages of one extract fetched at the same time
+MAX_PAGE_WORKERS = 8
 
 
-def fetch_data_from_api(indicator: str, date_range: str) -> pd.DataFrame:
+def fetch_page(
+    api_client: WorldBankApiClient, path: str, params: dict, page: int
+) -> list:
     """
-    Fetch data from the World Bank API.
+    Fetch a single page from the World Bank API.
 
     Parameters:
-        indicator (str): The indicator to fetch data for.
-        date_range (str): The date range for the data request.
+        api_client (WorldBankApiClient): The client used to send the request.
+        path (str): The indicator endpoint to query.
+        params (dict): The query parameters shared by every page.
+        page (int): The page number to fetch.
 
     Returns:
-        pd.DataFrame: The fetched data as a DataFrame.
+        list: The decoded response, i.e. [metadata, records].
     """
-    base_url = f"https://api.worldbank.org/v2/countries/all/indicators/{indicator}?"
-    params = {"date": date_range, "format": "json", "page": 1}  # Start at page 1
+    return api_client.get_json(path=path, params={**params, "page": page})
 
-    all_data = []
 
+def fetch_page_with_retry(
+    api_client: WorldBankApiClient, path: str, params: dict, page: int, per_page: int
+) -> tuple[list, int]:
+    """
+    Fetch a page, halving the page size until the request succeeds. Only
+    meant for the first page, whose metadata gives the page count.
+
+    Returns:
+        tuple: The decoded response and the page size it was fetched with.
+    """
     while True:
-        response = requests.get(base_url, params=params)
-        response_data = response.json()
+        try:
+            response_data = fetch_page(
+                api_client=api_client,
+                path=path,
+                params={**params, "per_page": per_page},
+                page=page,
+            )
+            raise_for_api_error(response_data)
+            return response_data, per_page
+        except (requests.RequestException, ValueError) as e:
+            if per_page % 2 or per_page // 2 < MIN_PER_PAGE:
+                raise
+            print(f"Page of {per_page} rows failed ({e}), retrying with smaller pages")
+            per_page //= 2
+
+
+def fetch_page_records(
+    api_client: WorldBankApiClient, path: str, params: dict, page: int, per_page: int
+) -> list[dict]:
+    """
+    Fetch the records of a page. If the page fails, it is fetched again as the
+    two pages of half its size that cover the same rows.
+
+    Parameters:
+        api_client (WorldBankApiClient): The client used to send the request.
+        path (str): The indicator endpoint to query.
+        params (dict): The query parameters shared by every page.
+        page (int): The page number to fetch.
+        per_page (int): The number of rows per page.
+
+    Returns:
+        list[dict]: The records of the page.
+    """
+    try:
+        response_data = fetch_page(
+            api_client=api_client,
+            path=path,
+            params={**params, "per_page": per_page},
+            page=page,
+        )
+        raise_for_api_error(response_data)
+    except (requests.RequestException, ValueError) as e:
+        if per_page % 2 or per_page // 2 < MIN_PER_PAGE:
+            raise
+        print(f"Page {page} of {per_page} rows failed ({e}), retrying as two pages")
+        half_page_records = []
+        for half_page in (2 * page - 1, 2 * page):
+            half_page_records.extend(
+                fetch_page_records(
+                    api_client=api_client,
+                    path=path,
+                    params=params,
+                    page=half_page,
+                    per_page=per_page // 2,
+                )
+            )
+        return half_page_records
+
+    if len(response_data) < 2 or not response_data[1]:
+        return []
+    return response_data[1]
+
+
+def raise_for_api_error(response_data: list) -> None:
+    """Raises the error message the API returns in place of the page metadata."""
+    if response_data and "message" in response_data[0]:
+        raise ValueError(f"World Bank API error: {response_data[0]['message']}")
+
+
+def fetch_last_updated(
+    indicator: str, source: int = None, api_client: WorldBankApiClient = None
+) -> str:
+    """
+    Fetch the date the World Bank last updated the data of an indicator, read
+    from the `lastupdated` metadata of a one row request.
+
+    Returns:
+        str: The date, e.g. "2024-06-28", or None if the API doesn't report it.
+    """
+    if api_client is None:
+        api_client = get_world_bank_api_client()
+    params = {"format": "json", "per_page": 1, "page": 1}
+    if source is not None:
+        params["source"] = source
+    # a cached response would hide updates for the cache ttl
+    response_data = api_client.get_json(
+        path=f"countries/all/indicators/{indicator}", params=params, use_cache=False
+    )
+    raise_for_api_error(response_data)
+    return response_data[0].get("lastupdated") if response_data else None
+
+
+def get_adaptive_per_page(total: int, max_workers: int) -> int:
+    """
+    Returns the page size that fetches `total` rows in about one round of
+    `max_workers` concurrent pages. The size is a power of two, so that a
+    failed page can be split in halves covering the same rows.
+    """
+    per_page = 2 ** math.ceil(math.log2(max(1, math.ceil(total / max_workers))))
+    return min(max(per_page, MIN_ADAPTIVE_PER_PAGE), MAX_ADAPTIVE_PER_PAGE)
+
+
+def normalize_records(records: list[dict], fields: list[str] = None) -> pd.DataFrame:
+    """
+    Flatten World Bank records into a DataFrame.
+
+    Parameters:
+        records (list[dict]): The records of one or more pages.
+        fields (list[str]): The dotted field paths to keep, e.g. "country.value".
+            Other fields are skipped instead of being normalized. Defaults to
+            every field.
+
+    Returns:
+        pd.DataFrame: One column per field, named by its dotted path.
+    """
+    if fields is None:
+        return pd.json_normalize(data=records)
+
+    # project each field straight into a column list
+    columns = {}
+    for field in fields:
+        keys = field.split(".")
+        if len(keys) == 1:
+            columns[field] = [record.get(field) for record in records]
+        elif len(keys) == 2:
+            parent_key, key = keys
+            columns[field] = [
+                (record.get(parent_key) or {}).get(key) for record in records
+            ]
+        else:
+            values = []
+            for record in records:
+                value = record
+                for key in keys:
+                    value = value.get(key) if isinstance(value, dict) else None
+                values.append(value)
+            columns[field] = values
+    return pd.DataFrame(columns)
 
+
+def iter_pages(
+    indicator: str,
+    date_range: str,
+    max_workers: int = MAX_PAGE_WORKERS,
+    api_client: WorldBankApiClient = None,
+    source: int = None,
+    per_page: Union[int, str] = "adaptive",
+) -> Iterator[list[dict]]:
+    """
+    Yield the records of each World Bank API page, in page order.
+
+    The first page is fetched on its own to read the total page count from the
+    response metadata, the remaining pages are then fetched concurrently with
+    at most `max_workers` pages in flight, so memory stays bounded however
+    many pages there are.
+
+    Parameters:
+        indicator (str): The indicator to fetch data for. Several indicators
+            can be requested at once by separating them with a semicolon, in
+            which case `source` is required by the API.
+        date_range (str): The date range for the data request.
+        max_workers (int): The maximum number of pages fetched at the same time.
+        api_client (WorldBankApiClient): Defaults to the shared client.
+        source (int): The World Bank source id of the indicators.
+        per_page (int | str): The number of rows per page, or "adaptive" to
+            size pages from the total row count reported by a one row request.
+            Failed pages are retried as smaller pages.
+
+    Yields:
+        list[dict]: The records of a page.
+    """
+    if api_client is None:
+        api_client = get_world_bank_api_client()
+    path = f"countries/all/indicators/{indicator}"
+    params = {"date": date_range, "format": "json"}
+    if source is not None:
+        params["source"] = source
+
+    if per_page == "adaptive":
+        # a one row page is enough to read the total row count
+        response_data, _ = fetch_page_with_retry(
+            api_client=api_client, path=path, params=params, page=1, per_page=1
+        )
+        total = int(response_data[0].get("total", 0)) if response_data else 0
+        if total == 0:  # Check if there's data
+            return
+        per_page = get_adaptive_per_page(total=total, max_workers=max_workers)
+        total_pages = math.ceil(total / per_page)
+        next_page = 1
+    else:
+        response_data, per_page = fetch_page_with_retry(
+            api_client=api_client, path=path, params=params, page=1, per_page=per_page
+        )
         if len(response_data) < 2 or not response_data[1]:  # Check if there's data
-            break
+            return
+        yield response_data[1]
+        total_pages = int(response_data[0].get("pages", 1))
+        next_page = 2
 
-        all_data.extend(response_data[1])  # Add current page data to all_data
+    if next_page <= total_pages:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending_pages = deque()
+            while next_page <= total_pages or pending_pages:
+                while next_page <= total_pages and len(pending_pages) < max_workers:
+                    # run in a copy of the context to keep tracking requests
+                    pending_pages.append(
+                        executor.submit(
+                            contextvars.copy_context().run,
+                            fetch_page_records,
+                            api_client=api_client,
+                            path=path,
+                            params=params,
+                            page=next_page,
+                            per_page=per_page,
+                        )
+                    )
+                    next_page += 1
+                # futures are consumed in submission order to keep pages in order
+                page_records = pending_pages.popleft().result()
+                if not page_records:
+                    continue
+                yield page_records
 
-        # Update parameters for the next page
-        params["page"] += 1
 
-    df = pd.json_normalize(data=all_data)
+def fetch_data_from_api(
+    indicator: str,
+    date_range: str,
+    max_workers: int = MAX_PAGE_WORKERS,
+    api_client: WorldBankApiClient = None,
+    source: int = None,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+) -> pd.DataFrame:
+    """
+    Fetch data from the World Bank API.
+
+    Parameters:
+        indicator (str): The indicator to fetch data for. Several indicators
+            can be requested at once by separating them with a semicolon, in
+            which case `source` is required by the API.
+        date_range (str): The date range for the data request.
+        max_workers (int): The maximum number of pages fetched at the same time.
+        api_client (WorldBankApiClient): Defaults to the shared client.
+        source (int): The World Bank source id of the indicators.
+        fields (list[str]): The fields to keep, see `normalize_records`.
+        per_page (int | str): The page size, see `iter_pages`.
+
+    Returns:
+        pd.DataFrame: The fetched data as a DataFrame.
+    """
+    all_data = []
+    for page_records in iter_pages(
+        indicator=indicator,
+        date_range=date_range,
+        max_workers=max_workers,
+        api_client=api_client,
+        source=source,
+        per_page=per_page,
+    ):
+        all_data.extend(page_records)  # Add current page data to all_data
+
+    df = normalize_records(records=all_data, fields=fields)
 
     return df
+
+
+def fetch_chunks_from_api(
+    indicator: str,
+    date_range: str,
+    chunk_rows: int = 10000,
+    max_workers: int = MAX_PAGE_WORKERS,
+    api_client: WorldBankApiClient = None,
+    source: int = None,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+) -> Iterator[pd.DataFrame]:
+    """
+    Fetch data from the World Bank API as a stream of DataFrames of at most
+    about `chunk_rows` rows, without holding the whole indicator in memory.
+
+    Parameters:
+        indicator (str): The indicator to fetch data for.
+        date_range (str): The date range for the data request.
+        chunk_rows (int): The number of rows after which a chunk is yielded.
+        max_workers (int): The maximum number of pages fetched at the same time.
+        api_client (WorldBankApiClient): Defaults to the shared client.
+        source (int): The World Bank source id of the indicators.
+        fields (list[str]): The fields to keep, see `normalize_records`.
+        per_page (int | str): The page size, see `iter_pages`.
+
+    Yields:
+        pd.DataFrame: The fetched data of a chunk of pages.
+    """
+    chunk_data = []
+    for page_records in iter_pages(
+        indicator=indicator,
+        date_range=date_range,
+        max_workers=max_workers,
+        api_client=api_client,
+        source=source,
+        per_page=per_page,
+    ):
+        chunk_data.extend(page_records)
+        if len(chunk_data) >= chunk_rows:
+            yield normalize_records(records=chunk_data, fields=fields)
+            chunk_data = []
+
+    if chunk_data:
+        yield normalize_records(records=chunk_data, fields=fields)
+
+
+def fetch_data_for_indicators(
+    indicators: list[str],
+    date_range: str,
+    source: int,
+    max_indicators_per_request: int = 60,
+    max_workers: int = MAX_PAGE_WORKERS,
+    api_client: WorldBankApiClient = None,
+    fields: list[str] = None,
+    per_page: Union[int, str] = "adaptive",
+) -> dict[str, pd.DataFrame]:
+    """
+    Fetch data for several indicators of the same source with as few requests
+    as possible.
+
+    Parameters:
+        indicators (list[str]): The indicators to fetch data for.
+        date_range (str): The date range for the data request.
+        source (int): The World Bank source id shared by the indicators.
+        max_indicators_per_request (int): The maximum number of indicators
+            sent in a single semicolon separated request.
+        max_workers (int): The maximum number of pages fetched at the same time.
+        api_client (WorldBankApiClient): Defaults to the shared client.
+        fields (list[str]): The fields to keep, see `normalize_records`.
+            Must include "indicator.id" if provided.
+        per_page (int | str): The page size, see `iter_pages`.
+
+    Returns:
+        dict[str, pd.DataFrame]: The fetched data of each indicator, keyed by
+            indicator id. Indicators without data map to an empty DataFrame.
+    """
+    indicator_dfs = {indicator: pd.DataFrame() for indicator in indicators}
+
+    for start in range(0, len(indicators), max_indicators_per_request):
+        batch = indicators[start : start + max_indicators_per_request]
+        df = fetch_data_from_api(
+            indicator=";".join(batch),
+            date_range=date_range,
+            max_workers=max_workers,
+            api_client=api_client,
+            source=source,
+            fields=fields,
+            per_page=per_page,
+        )
+        if df.empty:
+            continue
+        # fan the rows out by indicator.id
+        for indicator, df_indicator in df.groupby("indicator.id", sort=False):
+            if indicator in indicator_dfs:
+                indicator_dfs[indicator] = df_indicator.reset_index(drop=True)
+
+    return indicator_dfs
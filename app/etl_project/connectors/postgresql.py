@@ -1,13 +1,78 @@
-from sqlalchemy import create_engine, Table, MetaData, inspect
-from sqlalchemy.engine import URL, CursorResult
+import io
+import threading
+import time
+from itertools import islice
+from typing import Iterator
+from sqlalchemy import create_engine, Table, MetaData, inspect, literal_column, text
+from sqlalchemy.engine import URL, CursorResult, Engine
 from sqlalchemy.dialects import postgresql
 
 
+_engines: dict[URL, Engine] = {}
+_engines_lock = threading.Lock()
+
+ENGINE_OPTIONS = {
+    "pool_size": 10,
+    "max_overflow": 10,
+    "pool_pre_ping": True,  # replace connections dropped by the server
+    "pool_recycle": 1800,  # seconds, stay under idle timeouts of proxies and RDS
+}
+
+
+def get_engine(connection_url: URL) -> Engine:
+    """
+    Returns the engine of a connection url, creating it on first use, so that
+    every client of the same database in this process shares one connection pool.
+    """
+    with _engines_lock:
+        if connection_url not in _engines:
+            _engines[connection_url] = create_engine(connection_url, **ENGINE_OPTIONS)
+        return _engines[connection_url]
+
+
+def dispose_engines() -> None:
+    """Closes the connection pools of every engine in the registry."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+
+
+def iter_batches(data: list[dict], batch_size: int) -> Iterator[list[dict]]:
+    """Splits rows into lists of at most `batch_size` rows."""
+    rows = iter(data)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def to_csv_field(value) -> str:
+    """
+    Formats a value for COPY with `null '\\N'`. None is written as an unquoted
+    \\N and strings are always quoted, so empty strings, and strings equal to
+    \\N, load as strings like they do with insert and upsert.
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+# xmax is only set on rows that existed before the upsert, i.e. updated rows
+INSERTED_COLUMN = literal_column("(xmax = 0)").label("inserted")
+
+
 class PostgreSqlClient:
     """
     A client for querying postgresql database.
     """
 
+    # pg8000 sends the number of bind parameters as a signed 16 bit integer
+    MAX_PARAMETERS = 32767
+
     def __init__(
         self,
         server_name: str,
@@ -31,7 +96,7 @@ class PostgreSqlClient:
             database=database_name,
         )
 
-        self.engine = create_engine(connection_url)
+        self.engine = get_engine(connection_url)
 
     def select_all(self, table: Table) -> list[dict]:
         return [dict(row) for row in self.engine.execute(table.select()).all()]
@@ -54,19 +119,136 @@ class PostgreSqlClient:
         self.drop_table(table.name)
         self.insert(data=data, table=table, metadata=metadata)
 
-    def upsert(self, data: list[dict], table: Table, metadata: MetaData) -> None:
+    def upsert(
+        self,
+        data: list[dict],
+        table: Table,
+        metadata: MetaData,
+        chunk_size: int = 5000,
+        commit_per_chunk: bool = False,
+    ) -> list[dict]:
+        """
+        Upserts data in batches of at most `chunk_size` rows, made smaller if
+        needed to stay under the driver's bind parameter limit. All batches run
+        in a single transaction unless `commit_per_chunk` is set. If the table
+        has a row_hash column, rows whose hash is unchanged are not rewritten.
+
+        Returns the row, inserted and updated counts and duration of each batch.
+        """
         metadata.create_all(self.engine)
         key_columns = [
             pk_column.name for pk_column in table.primary_key.columns.values()
         ]
-        insert_statement = postgresql.insert(table).values(data)
-        upsert_statement = insert_statement.on_conflict_do_update(
-            index_elements=key_columns,
-            set_={
-                c.key: c for c in insert_statement.excluded if c.key not in key_columns
-            },
+        batch_size = max(
+            1, min(chunk_size, self.MAX_PARAMETERS // max(1, len(table.columns)))
         )
-        self.engine.execute(upsert_statement)
+
+        def execute_batch(connection, batch: list[dict]) -> dict:
+            start_time = time.perf_counter()
+            insert_statement = postgresql.insert(table).values(batch)
+            upsert_statement = insert_statement.on_conflict_do_update(
+                index_elements=key_columns,
+                set_={
+                    c.key: c
+                    for c in insert_statement.excluded
+                    if c.key not in key_columns
+                },
+                where=(
+                    table.c.row_hash.is_distinct_from(
+                        insert_statement.excluded.row_hash
+                    )
+                    if "row_hash" in table.columns
+                    else None
+                ),
+            ).returning(INSERTED_COLUMN)
+            inserted = [row.inserted for row in connection.execute(upsert_statement)]
+            return {
+                "rows": len(batch),
+                "inserted": sum(inserted),
+                "updated": len(inserted) - sum(inserted),
+                "seconds": time.perf_counter() - start_time,
+            }
+
+        batch_stats = []
+        if commit_per_chunk:
+            for batch in iter_batches(data, batch_size):
+                with self.engine.begin() as connection:
+                    batch_stats.append(execute_batch(connection, batch))
+        else:
+            with self.engine.begin() as connection:
+                for batch in iter_batches(data, batch_size):
+                    batch_stats.append(execute_batch(connection, batch))
+        return batch_stats
+
+    def copy_upsert(self, data: list[dict], table: Table, metadata: MetaData) -> dict:
+        """
+        Bulk upserts data by streaming it with COPY FROM STDIN into a temporary
+        staging table, then merging the staging table into the target table with
+        INSERT ... ON CONFLICT, all in a single transaction. If the table has a
+        row_hash column, rows whose hash is unchanged are not rewritten.
+
+        Returns the row, inserted and updated counts and duration of the load.
+        """
+        start_time = time.perf_counter()
+        metadata.create_all(self.engine)
+        quote = self.engine.dialect.identifier_preparer.quote
+        table_name = quote(table.name)
+        staging_table_name = quote(f"{table.name}_staging")
+        columns = [column.name for column in table.columns]
+        column_list = ", ".join(quote(column) for column in columns)
+        key_columns = [
+            pk_column.name for pk_column in table.primary_key.columns.values()
+        ]
+        update_columns = [column for column in columns if column not in key_columns]
+
+        csv_buffer = io.StringIO()
+        for row in data:
+            csv_buffer.write(
+                ",".join(to_csv_field(row.get(column)) for column in columns) + "\n"
+            )
+        csv_buffer.seek(0)
+
+        on_conflict = f"on conflict ({', '.join(quote(c) for c in key_columns)})"
+        if update_columns:
+            on_conflict += " do update set " + ", ".join(
+                f"{quote(c)} = excluded.{quote(c)}" for c in update_columns
+            )
+            if "row_hash" in columns:
+                on_conflict += (
+                    f" where {table_name}.row_hash is distinct from excluded.row_hash"
+                )
+        else:
+            on_conflict += " do nothing"
+
+        connection = self.engine.raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute(
+                f"create temporary table {staging_table_name} "
+                f"(like {table_name} including defaults) on commit drop"
+            )
+            cursor.execute(
+                f"copy {staging_table_name} ({column_list}) from stdin with (format csv, null '\\N')",
+                stream=csv_buffer,
+            )
+            cursor.execute(
+                f"insert into {table_name} ({column_list}) "
+                f"select {column_list} from {staging_table_name} {on_conflict} "
+                "returning (xmax = 0)"
+            )
+            inserted = [row[0] for row in cursor.fetchall()]
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        return {
+            "rows": len(data),
+            "inserted": sum(inserted),
+            "updated": len(inserted) - sum(inserted),
+            "seconds": time.perf_counter() - start_time,
+        }
 
     def table_exists(self, table_name: str) -> bool:
         """
@@ -77,6 +259,15 @@ class PostgreSqlClient:
     def execute_sql(self, sql: str) -> None:
         self.engine.execute(sql)
 
+    def execute_in_transaction(self, sqls: list) -> None:
+        """
+        Executes SQL strings or sqlalchemy statements in a single transaction,
+        so other sessions see either none or all of their changes.
+        """
+        with self.engine.begin() as connection:
+            for sql in sqls:
+                connection.execute(text(sql) if isinstance(sql, str) else sql)
+
     def run_sql(self, sql: str) -> list[dict]:
         """
         Execute SQL code provided and returns the result in a list of dictionaries.
@@ -0,0 +1,118 @@
+import os
+import shutil
+import uuid
+from pathlib import Path
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+class RawZoneWriter:
+    """
+    Stages the raw rows of one extract, which may arrive in chunks, and
+    replaces the year partitions of the indicator once the extract completes.
+    If the extract fails, the staged rows are discarded and the previous
+    snapshot stays in place.
+    """
+
+    def __init__(self, indicator_path: Path):
+        self.indicator_path = indicator_path
+        self.staging_path = indicator_path / f"_staging-{uuid.uuid4().hex}"
+        self._part_count = 0
+
+    def write(self, df: pd.DataFrame) -> None:
+        """Stages the rows of `df`, one parquet file per year."""
+        if df.empty:
+            return
+        for year, df_year in df.groupby("date", sort=False):
+            year_path = self.staging_path / f"year={year}"
+            year_path.mkdir(parents=True, exist_ok=True)
+            pq.write_table(
+                pa.Table.from_pandas(df_year, preserve_index=False),
+                year_path / f"part-{self._part_count:05d}.parquet",
+            )
+        self._part_count += 1
+
+    def commit(self) -> None:
+        """Replaces each staged year partition, one rename at a time."""
+        if not self.staging_path.exists():
+            return
+        for staged_year_path in self.staging_path.iterdir():
+            year_path = self.indicator_path / staged_year_path.name
+            replaced_path = self.staging_path / f"_replaced-{staged_year_path.name}"
+            if year_path.exists():
+                os.replace(year_path, replaced_path)
+            os.replace(staged_year_path, year_path)
+        self.discard()
+
+    def discard(self) -> None:
+        shutil.rmtree(self.staging_path, ignore_errors=True)
+
+    def __enter__(self) -> "RawZoneWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+
+class RawZone:
+    """
+    Local Parquet snapshots of the raw World Bank rows, before transform,
+    partitioned by indicator and year, e.g.
+
+        etl_project/data/raw/wb_indicator=SL.UEM.TOTL.ZS/year=2021/part-00000.parquet
+
+    Each extract replaces the year partitions it fetched, so the raw zone holds
+    the latest rows of every year extracted so far. Reads only open the
+    partitions of the requested years, memory mapped.
+    """
+
+    def __init__(self, base_path: str = "etl_project/data/raw"):
+        self.base_path = Path(base_path)
+
+    def _indicator_path(self, wb_indicator: str) -> Path:
+        return self.base_path / f"wb_indicator={wb_indicator}"
+
+    def writer(self, wb_indicator: str) -> RawZoneWriter:
+        """Returns a writer of one extract, to use as a context manager."""
+        return RawZoneWriter(self._indicator_path(wb_indicator))
+
+    def write(self, wb_indicator: str, df: pd.DataFrame) -> None:
+        """Replaces the year partitions of the rows of `df`."""
+        with self.writer(wb_indicator) as writer:
+            writer.write(df)
+
+    def get_years(self, wb_indicator: str) -> list[int]:
+        """Returns the years with a snapshot of an indicator."""
+        indicator_path = self._indicator_path(wb_indicator)
+        if not indicator_path.exists():
+            return []
+        return sorted(
+            int(year_path.name.partition("=")[2])
+            for year_path in indicator_path.glob("year=*")
+        )
+
+    def read(self, wb_indicator: str, date_range: str = None) -> pd.DataFrame:
+        """
+        Returns the raw rows of an indicator, of the years of `date_range`
+        (e.g. "2019:2021") or of every year if not set.
+        """
+        years = self.get_years(wb_indicator)
+        if date_range:
+            start, _, end = date_range.partition(":")
+            years = [year for year in years if int(start) <= year <= int(end or start)]
+
+        tables = [
+            pq.read_table(part_path, memory_map=True)
+            for year in years
+            for part_path in sorted(
+                (self._indicator_path(wb_indicator) / f"year={year}").glob("*.parquet")
+            )
+        ]
+        if not tables:
+            return pd.DataFrame()
+        # a column of nulls in one year has a type in another
+        return pa.concat_tables(tables, promote_options="default").to_pandas()
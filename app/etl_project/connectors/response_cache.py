@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+
+class ResponseCache:
+    """
+    An on-disk cache of World Bank API responses.
+
+    Each response is stored in its own file, keyed by the request path and
+    params (i.e. indicator, date range and page). Entries younger than
+    `ttl_seconds` are served without a request, older entries are revalidated
+    with their ETag/Last-Modified headers when the API provided them. The least
+    recently used entries are evicted once the cache grows over `max_size_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str = "etl_project/data/cache",
+        ttl_seconds: float = 3600,
+        max_size_bytes: int = 512 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self._lock = threading.Lock()
+        self._size_bytes = None  # computed on the first write
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(path: str, params: dict = None) -> str:
+        request = json.dumps(
+            {"path": path, "params": params or {}}, sort_keys=True, default=str
+        )
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> dict:
+        """
+        Returns the cached entry with keys [body, etag, last_modified, fetched_at]
+        or None if the key is not cached.
+        """
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r") as file:
+                entry = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        os.utime(entry_path)  # mark as recently used for eviction
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl_seconds
+
+    def set(self, key: str, body: str, etag: str = None, last_modified: str = None):
+        entry = {
+            "body": body,
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        entry_path = self._entry_path(key)
+        # write to a temporary file first so readers never see a partial entry
+        temp_path = entry_path.with_suffix(f".{threading.get_ident()}.tmp")
+        with open(temp_path, "w") as file:
+            json.dump(entry, file)
+        try:
+            replaced_size = entry_path.stat().st_size
+        except FileNotFoundError:
+            replaced_size = 0
+        os.replace(temp_path, entry_path)
+
+        with self._lock:
+            if self._size_bytes is not None:
+                # touch rewrites entries, only the difference adds to the size
+                self._size_bytes += entry_path.stat().st_size - replaced_size
+        if self._size_bytes is None or self._size_bytes > self.max_size_bytes:
+            self.evict()
+
+    def touch(self, key: str) -> None:
+        """Marks a revalidated entry as fresh again."""
+        entry = self.get(key)
+        if entry is not None:
+            self.set(
+                key=key,
+                body=entry["body"],
+                etag=entry["etag"],
+                last_modified=entry["last_modified"],
+            )
+
+    def evict(self) -> None:
+        """Deletes the least recently used entries until the cache fits."""
+        with self._lock:
+            entries = []
+            for entry_path in self.cache_dir.glob("*.json"):
+                try:
+                    stat = entry_path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+            total_size = sum(size for _, size, _ in entries)
+            for _, size, entry_path in sorted(entries):
+                if total_size <= self.max_size_bytes:
+                    break
+                entry_path.unlink(missing_ok=True)
+                total_size -= size
+            self._size_bytes = total_size
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry_path in self.cache_dir.glob("*.json"):
+                entry_path.unlink(missing_ok=True)
+            self._size_bytes = 0
@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+import requests
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+from requests.adapters import HTTPAdapter
+from etl_project.connectors.response_cache import ResponseCache
+
+# use a fast json decoder when one is installed, large pages are mostly decode time
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    try:
+        from simdjson import loads as json_loads
+    except ImportError:
+        from json import loads as json_loads
+
+
+class RequestStats:
+    """Counts the World Bank requests sent and bytes downloaded in a context."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, response_bytes: int) -> None:
+        with self._lock:
+            self.requests += 1
+            self.bytes += response_bytes
+
+
+_request_stats: ContextVar = ContextVar("world_bank_request_stats", default=None)
+
+
+@contextmanager
+def track_requests() -> Iterator[RequestStats]:
+    """
+    Counts the requests sent from the current context, including requests sent
+    from threads that run a copy of it, see `contextvars.copy_context`.
+    """
+    request_stats = RequestStats()
+    token = _request_stats.set(request_stats)
+    try:
+        yield request_stats
+    finally:
+        _request_stats.reset(token)
+
+
+def is_data_page(data) -> bool:
+    """
+    Whether a decoded body is a `[metadata, records]` page, rather than the
+    `[{"message": [...]}]` the API returns for errors, with status 200.
+    """
+    return (
+        isinstance(data, list)
+        and len(data) == 2
+        and isinstance(data[0], dict)
+        and "message" not in data[0]
+    )
+
+
+class WorldBankApiClient:
+    """
+    A client for querying the World Bank API.
+
+    Reuses a keep-alive session across requests, enforces a timeout on every
+    request and retries transient failures with exponential backoff and jitter.
+    """
+
+    RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+    def __init__(
+        self,
+        base_url: str = "https://api.worldbank.org/v2",
+        timeout: float = 30,
+        max_retries: int = 4,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 30,
+        pool_maxsize: int = 16,
+        response_cache: ResponseCache = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.response_cache = response_cache
+        self.pool_maxsize = pool_maxsize
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff_seconds(self, attempt: int) -> float:
+        """Full jitter: a random wait between 0 and the exponential backoff."""
+        backoff = min(self.backoff_max, self.backoff_factor * (2**attempt))
+        return random.uniform(0, backoff)
+
+    def get(
+        self, path: str, params: dict = None, headers: dict = None
+    ) -> requests.Response:
+        """
+        Sends a GET request to the World Bank API, retrying connection errors,
+        timeouts and retryable status codes.
+        """
+        url = f"{self.base_url}/{path.lstrip('/')}"
+        attempt = 0
+        while True:
+            try:
+                response = self.session.get(
+                    url, params=params, headers=headers, timeout=self.timeout
+                )
+                request_stats = _request_stats.get()
+                if request_stats is not None:
+                    request_stats.add(len(response.content))
+                if (
+                    response.status_code not in self.RETRY_STATUS_CODES
+                    or attempt >= self.max_retries
+                ):
+                    response.raise_for_status()
+                    return response
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= self.max_retries:
+                    raise
+                retry_after = None
+
+            if retry_after is not None and retry_after.isdigit():
+                wait_seconds = min(self.backoff_max, float(retry_after))
+            else:
+                wait_seconds = self._backoff_seconds(attempt)
+            attempt += 1
+            print(
+                f"Retrying World Bank request {url} in {wait_seconds:.2f}s (attempt {attempt} of {self.max_retries})"
+            )
+            time.sleep(wait_seconds)
+
+    def get_json(self, path: str, params: dict = None, use_cache: bool = True):
+        """
+        Sends a GET request and returns the decoded json body. With
+        `use_cache=False` the response cache is neither read nor written.
+        """
+        if self.response_cache is None or not use_cache:
+            return json_loads(self.get(path=path, params=params).content)
+
+        cache_key = self.response_cache.make_key(path=path, params=params)
+        entry = self.response_cache.get(cache_key)
+        if entry is not None and self.response_cache.is_fresh(entry):
+            return json_loads(entry["body"])
+
+        headers = {}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self.get(path=path, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:  # not modified
+            self.response_cache.touch(cache_key)
+            return json_loads(entry["body"])
+
+        data = json_loads(response.content)
+        if response.status_code == 200 and is_data_page(data):
+            self.response_cache.set(
+                key=cache_key,
+                body=response.text,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return data
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_shared_client: WorldBankApiClient = None
+_shared_client_lock = threading.Lock()
+
+
+def get_world_bank_api_client(**client_config) -> WorldBankApiClient:
+    """
+    Returns the process-wide World Bank API client so that every extract path
+    shares the same connection pool. `client_config` is only used when the
+    client is created, i.e. on the first call.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = WorldBankApiClient(**client_config)
+        return _shared_client
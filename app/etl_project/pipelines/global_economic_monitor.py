@@ -1,37 +1,56 @@
-from jinja2 import Environment, FileSystemLoader, Template
 from dotenv import load_dotenv
+import asyncio
 import os
 import requests
 import pandas as pd
 import yaml
 from pathlib import Path
 from importlib import import_module
-from sqlalchemy import Column, Float, Integer, MetaData, String, Table
 from etl_project.connectors.postgresql import PostgreSqlClient
+from etl_project.connectors.world_bank_api import get_world_bank_api_client
+from etl_project.connectors.response_cache import ResponseCache
+from etl_project.connectors.raw_zone import RawZone
+from etl_project.connectors.data_fetcher import MAX_PAGE_WORKERS, fetch_last_updated
 from etl_project.assets.metadata_logging import MetaDataLogging, MetaDataLoggingStatus
 from etl_project.assets.pipeline_logging import PipelineLogging
 from etl_project.assets.extract_load_transform import (
+    EXTRACT_FIELDS,
     extract,
+    extract_batch,
+    extract_stream,
+    get_indicator_table,
     transform,
     load,
+    load_stream,
     transform_sql,
+    transform_ranked,
+    update_watermark,
 )
-import schedule
-import time
+from etl_project.assets.pipeline_executor import (
+    PipelineResult,
+    ResourceLimits,
+    run_concurrently,
+    run_in_parallel,
+)
+from etl_project.assets.pipeline_scheduler import PipelineScheduler
+from etl_project.assets.pipeline_metrics import (
+    PipelineMetrics,
+    StageMetrics,
+    write_prometheus_file,
+)
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 
-# Define a unified function to run the entire ETL pipeline
-def pipeline(config: dict, pipeline_logging: PipelineLogging):
-    pipeline_logging.logger.info(f"Starting ETL pipeline - {wb_indicator}")
-    # set up environment variables
-    pipeline_logging.logger.info("Getting pipeline environment variables")
+def get_postgresql_client() -> PostgreSqlClient:
+    """Creates the client of the app database from environment variables"""
     SERVER_NAME = os.environ.get("SERVER_NAME")
     DATABASE_NAME = os.environ.get("DATABASE_NAME")
     DB_USERNAME = os.environ.get("DB_USERNAME")
     DB_PASSWORD = os.environ.get("DB_PASSWORD")
     PORT = os.environ.get("PORT")
 
-    postgresql_client = PostgreSqlClient(
+    return PostgreSqlClient(
         server_name=SERVER_NAME,
         database_name=DATABASE_NAME,
         username=DB_USERNAME,
@@ -39,97 +58,541 @@ def pipeline(config: dict, pipeline_logging: PipelineLogging):
         port=PORT,
     )
 
-    # Execute Extract, also has the api request
-    pipeline_logging.logger.info("Extracting data from database monitor API")
-    df_extracted = extract(
-        postgresql_client=postgresql_client,
-        extract_type=extract_type,
-        incremental_column=incremental_column,
-        table_name=extract_table_name,
-        wb_indicator=wb_indicator,
-        wb_daterange=wb_daterange,
-    )
-    pipeline_logging.logger.info("Extract step completed")
-
-    # Execute Transform
-    pipeline_logging.logger.info("Transforming dataframes")
-    df_transformed = transform(df_extracted, region_file_path=region_file_path)
-    pipeline_logging.logger.info("Transform step completed")
-
-    # Execute Load
-    pipeline_logging.logger.info("Loading data to postgres")
-
-    metadata = MetaData()
-    table = Table(
-        extract_table_name,
-        metadata,
-        Column("year", Integer, primary_key=True),
-        Column("country_code", String, primary_key=True),
-        Column("country_name", String),
-        Column("indicator_id", String),
-        Column("indicator_value", String),
-        Column("value", Float),
-        Column("region", String),
+
+# Define a unified function to run the entire ETL pipeline
+async def pipeline_async(
+    pipeline_config: dict,
+    pipeline_logging: PipelineLogging,
+    wb_indicator: str,
+    extract_table_name: str,
+    df_extracted: pd.DataFrame = None,
+    last_updated: str = None,
+    metrics: PipelineMetrics = None,
+    limits: ResourceLimits = None,
+):
+    """
+    Runs the ETL pipeline of one wb indicator. If `df_extracted` is provided,
+    e.g. by a batch extract, the extract step is skipped. Otherwise, if
+    `extract.stream` is set, pages flow through transform and load in chunks.
+
+    `last_updated` is the World Bank lastupdated date the extract was based on,
+    it is fetched if not provided. It is saved with the indicator's watermark
+    once the data is loaded.
+
+    With `raw_zone.enabled`, the extracted rows are saved to the raw zone before
+    transform. With `raw_zone.replay`, the rows of `config.date_range` are read
+    from the raw zone instead of the api, and the watermark is left as is.
+
+    The time, api requests, rows and memory of each stage are recorded in
+    `metrics`.
+
+    Stages run on worker threads, each holding a slot of the resource it waits
+    on in `limits`, so indicators sharing the event loop overlap their api
+    requests and database writes. Slots are taken before a stage's metrics
+    start, so stage times don't include waiting for a slot.
+    """
+    if limits is None:
+        limits = ResourceLimits()
+    pipeline_logging.logger.info(f"Starting ETL pipeline - {wb_indicator}")
+    config = pipeline_config.get("config")
+    extract_config = pipeline_config.get("extract")
+    # skip normalizing the api fields that transform doesn't use
+    extract_fields = EXTRACT_FIELDS if extract_config.get("project_fields") else None
+    load_config = pipeline_config.get("load", {})
+    load_method = load_config.get("load_method", "upsert")
+    # set up environment variables
+    pipeline_logging.logger.info("Getting pipeline environment variables")
+    postgresql_client = get_postgresql_client()
+
+    if metrics is None:
+        metrics = PipelineMetrics(
+            pipeline_name=pipeline_config.get("name"), wb_indicator=wb_indicator
+        )
+
+    lookback_years = extract_config.get("lookback_years", 0)
+    raw_zone_config = pipeline_config.get("raw_zone", {})
+    replay = raw_zone_config.get("replay", False)
+    raw_zone = (
+        RawZone(base_path=raw_zone_config.get("path", "etl_project/data/raw"))
+        if raw_zone_config.get("enabled") or replay
+        else None
     )
 
-    load(
-        df=df_transformed,
-        postgresql_client=postgresql_client,
-        table=table,
-        metadata=metadata,
-        load_method="upsert",
+    def fetch_last_updated_if_missing() -> None:
+        nonlocal last_updated
+        if last_updated is None:
+            last_updated = fetch_last_updated(
+                indicator=wb_indicator, source=extract_config.get("source")
+            )
+
+    def save_watermark(years_loaded: list[int]) -> None:
+        if replay:
+            return  # nothing was extracted, the api may have moved on since
+        update_watermark(
+            postgresql_client=postgresql_client,
+            wb_indicator=wb_indicator,
+            years_loaded=years_loaded,
+            last_updated=last_updated,
+            lookback_years=lookback_years,
+        )
+
+    # row hashes let upsert and copy skip rows that haven't changed
+    table, metadata = get_indicator_table(
+        table_name=extract_table_name, row_hash=load_config.get("row_hash", False)
     )
-    pipeline_logging.logger.info("Load step completed")
+
+    df_transformed = None
+    if df_extracted is None and extract_config.get("stream") and not replay:
+        # Execute Extract, Transform and Load chunk by chunk so memory stays flat
+        pipeline_logging.logger.info(
+            "Streaming data from database monitor API to postgres"
+        )
+
+        def extract_transform_load(stage: StageMetrics) -> list[int]:
+            fetch_last_updated_if_missing()
+            dfs_extracted = extract_stream(
+                postgresql_client=postgresql_client,
+                extract_type=extract_config.get("extract_type"),
+                incremental_column=extract_config.get("incremental_column"),
+                table_name=extract_table_name,
+                wb_indicator=wb_indicator,
+                wb_daterange=config.get("date_range"),
+                chunk_rows=extract_config.get("chunk_rows", 10000),
+                fields=extract_fields,
+                per_page=extract_config.get("per_page", "adaptive"),
+                last_updated=last_updated,
+                lookback_years=lookback_years,
+            )
+
+            def snapshot_stream(dfs):
+                # the snapshot replaces the previous one once the extract completes
+                with raw_zone.writer(wb_indicator) as writer:
+                    for df in dfs:
+                        writer.write(df)
+                        yield df
+
+            if raw_zone is not None:
+                dfs_extracted = snapshot_stream(dfs_extracted)
+
+            def transform_stream(dfs):
+                for df in dfs:
+                    stage.rows_in += len(df)
+                    df_chunk = transform(
+                        df, region_file_path=config.get("region_classification_path")
+                    )
+                    stage.rows_out += len(df_chunk)
+                    yield df_chunk
+
+            return load_stream(
+                dfs=transform_stream(dfs_extracted),
+                postgresql_client=postgresql_client,
+                table=table,
+                metadata=metadata,
+                load_method=load_method,
+                chunk_size=load_config.get("chunk_size", 5000),
+                commit_per_chunk=load_config.get("commit_per_chunk", False),
+            )
+
+        # the stream alternates api pages and database writes, so it holds both
+        async with limits.acquire("api"), limits.acquire("db"):
+            with metrics.stage("extract_transform_load", rows_in=0) as stage:
+                stage.rows_out = 0
+                years_loaded = await asyncio.to_thread(extract_transform_load, stage)
+            await asyncio.to_thread(save_watermark, years_loaded)
+        pipeline_logging.logger.info("Stream extract, transform and load completed")
+
+        if not years_loaded:
+            pipeline_logging.logger.info("No new data extracted, skipping ranked table")
+            pipeline_logging.logger.info("Pipeline run successful")
+            return
+    else:
+        # Execute Extract, also has the api request
+        if df_extracted is None and replay:
+            pipeline_logging.logger.info("Replaying data from the raw zone")
+            async with limits.acquire("cpu"):
+                with metrics.stage("replay") as stage:
+                    df_extracted = await asyncio.to_thread(
+                        raw_zone.read,
+                        wb_indicator=wb_indicator,
+                        date_range=config.get("date_range"),
+                    )
+                    stage.rows_out = len(df_extracted)
+            pipeline_logging.logger.info("Replay step completed")
+        elif df_extracted is None:
+            pipeline_logging.logger.info("Extracting data from database monitor API")
+            async with limits.acquire("api"):
+                with metrics.stage("extract") as stage:
+                    await asyncio.to_thread(fetch_last_updated_if_missing)
+                    df_extracted = await asyncio.to_thread(
+                        extract,
+                        postgresql_client=postgresql_client,
+                        extract_type=extract_config.get("extract_type"),
+                        incremental_column=extract_config.get("incremental_column"),
+                        table_name=extract_table_name,
+                        wb_indicator=wb_indicator,
+                        wb_daterange=config.get("date_range"),
+                        fields=extract_fields,
+                        per_page=extract_config.get("per_page", "adaptive"),
+                        last_updated=last_updated,
+                        lookback_years=lookback_years,
+                    )
+                    stage.rows_out = len(df_extracted)
+            pipeline_logging.logger.info("Extract step completed")
+        else:
+            pipeline_logging.logger.info("Using data from batch extract")
+
+        if raw_zone is not None and not replay:
+            pipeline_logging.logger.info("Saving extracted data to the raw zone")
+            async with limits.acquire("cpu"):
+                with metrics.stage("snapshot", rows_in=len(df_extracted)):
+                    await asyncio.to_thread(
+                        raw_zone.write, wb_indicator=wb_indicator, df=df_extracted
+                    )
+
+        # World Bank data only changes a few times a year, most runs find nothing new
+        if df_extracted.empty:
+            pipeline_logging.logger.info(
+                "No new data extracted, skipping transform, load and ranked table"
+            )
+            await limits.run("db", save_watermark, [])
+            pipeline_logging.logger.info("Pipeline run successful")
+            return
+
+        # Execute Transform
+        pipeline_logging.logger.info("Transforming dataframes")
+        async with limits.acquire("cpu"):
+            with metrics.stage("transform", rows_in=len(df_extracted)) as stage:
+                df_transformed = await asyncio.to_thread(
+                    transform,
+                    df_extracted,
+                    region_file_path=config.get("region_classification_path"),
+                )
+                stage.rows_out = len(df_transformed)
+        pipeline_logging.logger.info("Transform step completed")
+
+        # Execute Load
+        pipeline_logging.logger.info("Loading data to postgres")
+        years_loaded = sorted(int(year) for year in df_transformed["year"].unique())
+        async with limits.acquire("db"):
+            with metrics.stage("load", rows_in=len(df_transformed)) as stage:
+                batch_stats = await asyncio.to_thread(
+                    load,
+                    df=df_transformed,
+                    postgresql_client=postgresql_client,
+                    table=table,
+                    metadata=metadata,
+                    load_method=load_method,
+                    chunk_size=load_config.get("chunk_size", 5000),
+                    commit_per_chunk=load_config.get("commit_per_chunk", False),
+                )
+                # rows written, unchanged rows are skipped with row hashing
+                stage.rows_out = (
+                    sum(batch["inserted"] + batch["updated"] for batch in batch_stats)
+                    if batch_stats
+                    else len(df_transformed)
+                )
+            await asyncio.to_thread(save_watermark, years_loaded)
+        if batch_stats:
+            rows_loaded = sum(batch["rows"] for batch in batch_stats)
+            rows_changed = sum(
+                batch["inserted"] + batch["updated"] for batch in batch_stats
+            )
+            pipeline_logging.logger.info(
+                f"Loaded {rows_loaded} rows in {len(batch_stats)} batches, "
+                f"{sum(batch['seconds'] for batch in batch_stats):.3f}s: "
+                f"{sum(batch['inserted'] for batch in batch_stats)} inserted, "
+                f"{sum(batch['updated'] for batch in batch_stats)} updated, "
+                f"{rows_loaded - rows_changed} unchanged"
+            )
+        pipeline_logging.logger.info("Load step completed")
+        if batch_stats and rows_changed == 0:
+            pipeline_logging.logger.info("No rows changed, skipping ranked table")
+            pipeline_logging.logger.info("Pipeline run successful")
+            return
 
     pipeline_logging.logger.info("Create ranked table started")
     # Execute 2nd-level transformation i.e., create a unemployment_ranked table using jinja and partition
-    transform_environment = Environment(
-        loader=FileSystemLoader("etl_project/sql/transform")
-    )
-
     transform_table_name = f"{extract_table_name}_ranked"
-    transform_sql(
-        table_name=transform_table_name,
-        postgresql_client=postgresql_client,
-        environment=transform_environment,
-    )
-
+    transform_sql_config = pipeline_config.get("transform_sql", {})
+    async with limits.acquire("db"):
+        with metrics.stage(
+            "transform_sql",
+            rows_in=len(df_transformed) if df_transformed is not None else None,
+        ):
+            if (
+                transform_sql_config.get("engine") == "pandas"
+                and df_transformed is not None
+            ):
+                # rank the rows already in memory instead of scanning and sorting in postgres
+                await asyncio.to_thread(
+                    transform_ranked,
+                    df=df_transformed,
+                    table_name=transform_table_name,
+                    postgresql_client=postgresql_client,
+                )
+            else:
+                await asyncio.to_thread(
+                    transform_sql,
+                    table_name=transform_table_name,
+                    postgresql_client=postgresql_client,
+                    # incremental mode only recomputes the years just loaded
+                    years=(
+                        years_loaded
+                        if transform_sql_config.get("mode") == "incremental"
+                        else None
+                    ),
+                )
     pipeline_logging.logger.info("Create ranked table completed")
     pipeline_logging.logger.info("Pipeline run successful")
 
 
-def run_pipeline(
+def pipeline(**kwargs) -> None:
+    """
+    Runs `pipeline_async` on an event loop of its own, for callers on worker
+    threads, see `pipeline_async` for the arguments.
+    """
+    asyncio.run(pipeline_async(**kwargs))
+
+
+async def run_pipeline_async(
     pipeline_name: str,
     postgresql_logging_client: PostgreSqlClient,
     pipeline_config: dict,
-    # wb_indicator: str,
-    # extract_table_name: str
-):
+    wb_indicator: str,
+    extract_table_name: str,
+    df_extracted: pd.DataFrame = None,
+    last_updated: str = None,
+    limits: ResourceLimits = None,
+) -> str:
+    """
+    Runs the pipeline of one wb indicator with its own logging context and
+    returns the run status. Each indicator logs under its own pipeline name, to
+    a logger of its own run, so that indicators can run concurrently.
+    """
+    indicator_pipeline_name = f"{pipeline_name}_{extract_table_name}"
+    logging_config = pipeline_config.get("logging", {})
     pipeline_logging = PipelineLogging(
-        pipeline_name=pipeline_config.get("name"),
+        pipeline_name=indicator_pipeline_name,
         log_folder_path=pipeline_config.get("config").get("log_folder_path"),
+        max_buffer_bytes=logging_config.get("max_buffer_bytes", 1048576),
+        compress=logging_config.get("compress", False),
     )
     metadata_logger = MetaDataLogging(
-        pipeline_name=pipeline_name,
+        pipeline_name=indicator_pipeline_name,
         postgresql_client=postgresql_logging_client,
         config=pipeline_config.get("config"),
     )
+    metrics = PipelineMetrics(pipeline_name=pipeline_name, wb_indicator=wb_indicator)
+    status = MetaDataLoggingStatus.RUN_FAILURE
     try:
         metadata_logger.log()  # log start
 
-        pipeline(
-            config=pipeline_config.get("config"), pipeline_logging=pipeline_logging
+        await pipeline_async(
+            pipeline_config=pipeline_config,
+            pipeline_logging=pipeline_logging,
+            wb_indicator=wb_indicator,
+            extract_table_name=extract_table_name,
+            df_extracted=df_extracted,
+            last_updated=last_updated,
+            metrics=metrics,
+            limits=limits,
         )
-        metadata_logger.log(
-            status=MetaDataLoggingStatus.RUN_SUCCESS, logs=pipeline_logging.get_logs()
-        )  # log end
-        pipeline_logging.logger.handlers.clear()
-    except BaseException as e:
+        status = MetaDataLoggingStatus.RUN_SUCCESS
+    except asyncio.CancelledError:
+        # logged as failed, but cancellation must still stop the task
+        pipeline_logging.logger.error("Pipeline run cancelled")
+        raise
+    except Exception as e:
         pipeline_logging.logger.error(f"Pipeline run failed. See detailed logs: {e}")
+    finally:
+        pipeline_logging.logger.info(f"Stage metrics: {metrics.summary()}")
         metadata_logger.log(
-            status=MetaDataLoggingStatus.RUN_FAILURE, logs=pipeline_logging.get_logs()
-        )  # log error
-        pipeline_logging.logger.handlers.clear()
+            status=status,
+            logs=pipeline_logging.get_logs(),
+            metrics=metrics.to_dicts(),
+        )  # log end
+        publish_metrics(pipeline_config=pipeline_config, metrics=metrics)
+        pipeline_logging.close()
+    return status
+
+
+def run_pipeline(**kwargs) -> str:
+    """
+    Runs `run_pipeline_async` on an event loop of its own, for callers on
+    worker threads, see `run_pipeline_async` for the arguments.
+    """
+    return asyncio.run(run_pipeline_async(**kwargs))
+
+
+def publish_metrics(pipeline_config: dict, metrics: PipelineMetrics) -> None:
+    """Writes the metrics to the prometheus file, if one is configured."""
+    prometheus_file = pipeline_config.get("metrics", {}).get("prometheus_file")
+    if prometheus_file:
+        try:
+            write_prometheus_file(metrics=metrics, file_path=prometheus_file)
+        except OSError as e:
+            print(f"Failed to write metrics to {prometheus_file}: {e}")
+
+
+def batch_extract(
+    pipeline_config: dict, wb_indicators: list[str]
+) -> tuple[dict[str, pd.DataFrame], dict[str, str]]:
+    """
+    Extracts every wb indicator in as few api requests as possible, returning
+    the dataframe and the World Bank lastupdated date of each indicator. Both
+    are empty if the batch extract fails, the pipelines extract per indicator
+    then.
+    """
+    extract_config = pipeline_config.get("extract")
+    table_config = pipeline_config.get("table_names")
+    extracted_dfs = {}
+    last_updated = {}
+    batch_metrics = PipelineMetrics(
+        pipeline_name=pipeline_config.get("name"), wb_indicator="batch"
+    )
+    try:
+        with batch_metrics.stage("extract") as stage:
+            # the batch and the pipelines must save the lastupdated date the
+            # extract was based on, so it is fetched once for both
+            last_updated = {
+                wb_indicator: fetch_last_updated(
+                    indicator=wb_indicator, source=extract_config.get("source")
+                )
+                for wb_indicator in wb_indicators
+            }
+            extracted_dfs = extract_batch(
+                postgresql_client=get_postgresql_client(),
+                extract_type=extract_config.get("extract_type"),
+                incremental_column=extract_config.get("incremental_column"),
+                table_config={
+                    wb_indicator: table_config[wb_indicator]
+                    for wb_indicator in wb_indicators
+                },
+                wb_daterange=pipeline_config.get("config").get("date_range"),
+                wb_source=extract_config.get("source"),
+                fields=(
+                    EXTRACT_FIELDS if extract_config.get("project_fields") else None
+                ),
+                per_page=extract_config.get("per_page", "adaptive"),
+                last_updated=last_updated,
+                lookback_years=extract_config.get("lookback_years", 0),
+            )
+            stage.rows_out = sum(len(df) for df in extracted_dfs.values())
+    except Exception as e:
+        print(f"Batch extract failed, extracting per indicator instead: {e}")
+        extracted_dfs, last_updated = {}, {}
+    print(f"Batch stage metrics: {batch_metrics.summary()}")
+    publish_metrics(pipeline_config=pipeline_config, metrics=batch_metrics)
+    return extracted_dfs, last_updated
+
+
+def print_results(
+    pipeline_config: dict, results: dict[str, PipelineResult]
+) -> dict[str, PipelineResult]:
+    table_config = pipeline_config.get("table_names")
+    for wb_indicator, result in results.items():
+        print(
+            f"wb_indicator: {wb_indicator}, extract_table_name: {table_config[wb_indicator]}, status: {result.status}"
+        )
+    return results
+
+
+def use_batch_extract(pipeline_config: dict) -> bool:
+    """Replays read each indicator from the raw zone, there is nothing to batch."""
+    return pipeline_config.get("extract").get("batch") and not pipeline_config.get(
+        "raw_zone", {}
+    ).get("replay")
+
+
+def run_pipelines(
+    pipeline_config: dict,
+    postgresql_logging_client: PostgreSqlClient,
+    wb_indicators: list[str],
+) -> dict[str, PipelineResult]:
+    """
+    Runs the pipelines of the given wb indicators concurrently, each on a
+    worker thread, using a batch extract first if enabled in the config.
+    """
+    extracted_dfs, last_updated = {}, {}
+    if use_batch_extract(pipeline_config):
+        extracted_dfs, last_updated = batch_extract(
+            pipeline_config=pipeline_config, wb_indicators=wb_indicators
+        )
+
+    # run the pipeline of each indicator concurrently
+    results = run_in_parallel(
+        pipelines={
+            wb_indicator: partial(
+                run_pipeline,
+                pipeline_name=pipeline_config.get("name"),
+                postgresql_logging_client=postgresql_logging_client,
+                pipeline_config=pipeline_config,
+                wb_indicator=wb_indicator,
+                extract_table_name=pipeline_config.get("table_names")[wb_indicator],
+                df_extracted=extracted_dfs.get(wb_indicator),
+                last_updated=last_updated.get(wb_indicator),
+            )
+            for wb_indicator in wb_indicators
+        },
+        max_workers=pipeline_config.get("schedule", {}).get("max_workers", 4),
+    )
+    return print_results(pipeline_config=pipeline_config, results=results)
+
+
+async def run_pipelines_async(
+    pipeline_config: dict,
+    postgresql_logging_client: PostgreSqlClient,
+    wb_indicators: list[str],
+    limits: ResourceLimits,
+) -> dict[str, PipelineResult]:
+    """
+    Runs the pipelines of the given wb indicators concurrently on the running
+    event loop, bounded by `limits`, which every job of the loop shares. Uses a
+    batch extract first if enabled in the config.
+    """
+    extracted_dfs, last_updated = {}, {}
+    if use_batch_extract(pipeline_config):
+        extracted_dfs, last_updated = await limits.run(
+            "api",
+            batch_extract,
+            pipeline_config=pipeline_config,
+            wb_indicators=wb_indicators,
+        )
+
+    results = await run_concurrently(
+        pipelines={
+            wb_indicator: partial(
+                run_pipeline_async,
+                pipeline_name=pipeline_config.get("name"),
+                postgresql_logging_client=postgresql_logging_client,
+                pipeline_config=pipeline_config,
+                wb_indicator=wb_indicator,
+                extract_table_name=pipeline_config.get("table_names")[wb_indicator],
+                df_extracted=extracted_dfs.get(wb_indicator),
+                last_updated=last_updated.get(wb_indicator),
+                limits=limits,
+            )
+            for wb_indicator in wb_indicators
+        }
+    )
+    return print_results(pipeline_config=pipeline_config, results=results)
+
+
+def get_job_schedule(schedule_config: dict, extract_table_name: str) -> dict:
+    """Returns the schedule of a table's job, its override or the default."""
+    return schedule_config.get("indicators", {}).get(
+        extract_table_name, schedule_config.get("default")
+    )
+
+
+async def run_scheduler_async(
+    pipeline_scheduler: PipelineScheduler, limits: ResourceLimits, poll_seconds: float
+) -> None:
+    """Runs the scheduled jobs on this event loop, with threads for every stage slot."""
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=limits.thread_count)
+    )
+    await pipeline_scheduler.run_forever_async(poll_seconds=poll_seconds)
 
 
 if __name__ == "__main__":
@@ -155,14 +618,17 @@ if __name__ == "__main__":
             pipeline_config = yaml.safe_load(yaml_file)
             config = pipeline_config.get("config")
             PIPELINE_NAME = pipeline_config.get("name")
-
-            wb_daterange = config.get("date_range")
-            region_file_path = config.get("region_classification_path")
-
-            incremental_column = pipeline_config.get("extract").get(
-                "incremental_column"
+            cache_config = dict(pipeline_config.get("cache", {}))
+            get_world_bank_api_client(
+                **pipeline_config.get("api", {}),
+                response_cache=(
+                    ResponseCache(**cache_config)
+                    if cache_config.pop("enabled", False)
+                    else None
+                ),
             )
-            extract_type = pipeline_config.get("extract").get("extract_type")
+
+            extract_config = pipeline_config.get("extract")
             table_config = pipeline_config.get("table_names")
             keys = list(table_config.keys())  # get key pair values
 
@@ -171,30 +637,64 @@ if __name__ == "__main__":
             f"Missing {yaml_file_path} file! Please create the yaml file with at least a `name` key for the pipeline name."
         )
 
-    # Set the run interval
-    wait_interval_seconds = pipeline_config.get("schedule", {}).get(
-        "wait_interval_seconds", 10
-    )
+    schedule_config = pipeline_config.get("schedule", {})
+    runtime_config = dict(pipeline_config.get("runtime", {}))
+    async_runtime = runtime_config.pop("mode", "threads") == "async"
+    if async_runtime:
+        # every api stage fetches several pages at once, connections beyond the
+        # pool size would be opened and thrown away on each request
+        pool_maxsize = get_world_bank_api_client().pool_maxsize
+        # one event loop runs every job, bounded per resource instead of per job
+        limits = ResourceLimits(
+            **runtime_config, max_api=max(1, pool_maxsize // MAX_PAGE_WORKERS)
+        )
+        run_job = partial(run_pipelines_async, limits=limits)
+    else:
+        run_job = run_pipelines
 
-    # Dynamic looping of wb indicators so we only need to update the yaml file with new indicators
+    # Dynamic scheduling of wb indicators so we only need to update the yaml file with new indicators
     # Iterate over table_names key-value pairs to get each wb indicator and table name
-
-    while True:
+    pipeline_scheduler = PipelineScheduler(
+        max_workers=schedule_config.get("max_workers", 4)
+    )
+    if extract_config.get("batch"):
+        # a batch extract covers every indicator, so they share one schedule
+        pipeline_scheduler.add_job(
+            name=PIPELINE_NAME,
+            job_func=partial(
+                run_job,
+                pipeline_config=pipeline_config,
+                postgresql_logging_client=postgresql_logging_client,
+                wb_indicators=keys,
+            ),
+            schedule_config=schedule_config.get("default"),
+        )
+    else:
         for wb_indicator in keys:
             extract_table_name = table_config[wb_indicator]
-            print(
-                f"wb_indicator: {wb_indicator}, extract_table_name: {extract_table_name}"
+            pipeline_scheduler.add_job(
+                name=extract_table_name,
+                job_func=partial(
+                    run_job,
+                    pipeline_config=pipeline_config,
+                    postgresql_logging_client=postgresql_logging_client,
+                    wb_indicators=[wb_indicator],
+                ),
+                schedule_config=get_job_schedule(
+                    schedule_config=schedule_config,
+                    extract_table_name=extract_table_name,
+                ),
             )
 
-            # call run_pipeline for each indicator
-            run_pipeline(
-                pipeline_name=PIPELINE_NAME,
-                postgresql_logging_client=postgresql_logging_client,
-                pipeline_config=pipeline_config,
+    if async_runtime:
+        asyncio.run(
+            run_scheduler_async(
+                pipeline_scheduler=pipeline_scheduler,
+                limits=limits,
+                poll_seconds=schedule_config.get("poll_seconds", 60),
             )
-
-            time.sleep(wait_interval_seconds)
-
-        time.sleep(
-            pipeline_config.get("schedule").get("incremental_run_interval_seconds")
+        )
+    else:
+        pipeline_scheduler.run_forever(
+            poll_seconds=schedule_config.get("poll_seconds", 60)
         )
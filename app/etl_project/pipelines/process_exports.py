@@ -14,6 +14,8 @@ from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_e
 from sqlalchemy.dialects import postgresql
 from sqlalchemy.engine import URL
 from etl_project.connectors.postgresql import PostgreSqlClient
+from etl_project.connectors.world_bank_api import get_world_bank_api_client
+from etl_project.connectors.response_cache import ResponseCache
 from etl_project.assets.metadata_logging import MetaDataLogging, MetaDataLoggingStatus
 from etl_project.assets.pipeline_logging import PipelineLogging
 import schedule
@@ -34,7 +36,9 @@ def pipeline(config: dict, pipeline_logging: PipelineLogging):
     # Execute Extract, also has the api request
     pipeline_logging.logger.info("Extracting data from database monitor API")
     df_extracted = extract(
-        indicator=config["indicator_export"], date_range=config["date_range"]
+        indicator=config["indicator_export"],
+        date_range=config["date_range"],
+        per_page=config.get("per_page", "adaptive"),
     )
     pipeline_logging.logger.info("Extract step completed")
 
@@ -95,13 +99,13 @@ def run_pipeline(
         metadata_logger.log(
             status=MetaDataLoggingStatus.RUN_SUCCESS, logs=pipeline_logging.get_logs()
         )  # log end
-        pipeline_logging.logger.handlers.clear()
     except BaseException as e:
         pipeline_logging.logger.error(f"Pipeline run failed. See detailed logs: {e}")
         metadata_logger.log(
             status=MetaDataLoggingStatus.RUN_FAILURE, logs=pipeline_logging.get_logs()
         )  # log error
-        pipeline_logging.logger.handlers.clear()
+    finally:
+        pipeline_logging.close()
 
 
 if __name__ == "__main__":
@@ -127,6 +131,15 @@ if __name__ == "__main__":
             pipeline_config = yaml.safe_load(yaml_file)
             config = pipeline_config.get("config")
             PIPELINE_NAME = pipeline_config.get("name")
+            cache_config = dict(pipeline_config.get("cache", {}))
+            get_world_bank_api_client(
+                **pipeline_config.get("api", {}),
+                response_cache=(
+                    ResponseCache(**cache_config)
+                    if cache_config.pop("enabled", False)
+                    else None
+                ),
+            )
     else:
         raise Exception(
             f"Missing {yaml_file_path} file! Please create the yaml file with at least a `name` key for the pipeline name."
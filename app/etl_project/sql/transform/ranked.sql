@@ -0,0 +1,14 @@
+select
+    year,
+    country_code,
+    country_name,
+    region,
+    value as "{{ metric_name }}",
+    avg(value) over (partition by year) as avg_{{ metric_name }}_by_year,
+    avg(value) over (partition by region) as avg_{{ metric_name }}_by_region,
+    rank() over (partition by year order by value desc) as rank_{{ metric_name }}_by_year,
+    rank() over (partition by year, region order by value desc) as rank_{{ metric_name }}_by_region
+from {{ source_table_name }}
+where region <> 'nan'
+{% if years %}and year in ({{ years | join(", ") }}){% endif %}
+order by year, country_code
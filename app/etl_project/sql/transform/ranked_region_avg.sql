@@ -0,0 +1,13 @@
+update {{ table_name }} as ranked
+set avg_{{ metric_name }}_by_region = region_avg.avg_value
+from (
+    select region, avg(value) as avg_value
+    from {{ source_table_name }}
+    where region <> 'nan'
+    and region in (
+        select distinct region from {{ source_table_name }} where year in ({{ years | join(", ") }})
+    )
+    group by region
+) as region_avg
+where ranked.region = region_avg.region
+and ranked.avg_{{ metric_name }}_by_region is distinct from region_avg.avg_value
@@ -1,13 +0,0 @@
-select
-    year,
-    country_code,
-    country_name,
-    region,
-    value as "unemployment",
-    avg(value) over (partition by year) as avg_unemployment_by_year,
-    avg(value) over (partition by region) as avg_unemployment_by_region,
-    rank() over (partition by year order by value desc) as rank_unemployment_by_year,
-    rank() over (partition by year, region order by value desc) as rank_unemployment_by_region
-from unemployment
-where region <> 'nan'
-order by year, country_code
\ No newline at end of file
@@ -0,0 +1,199 @@
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+import pandas as pd
+
+REGION_FILE_PATH = (
+    Path(__file__).resolve().parent.parent / "etl_project" / "data" / "CLASS_CSV.csv"
+)
+
+
+def get_countries(country_count: int) -> list[tuple[str, str]]:
+    """
+    Returns (code, name) of `country_count` countries. Countries of the region
+    classification come first so that transform keeps their rows, the rest
+    get made up codes that transform filters out.
+    """
+    df = pd.read_csv(REGION_FILE_PATH, encoding="utf-8-sig")
+    df = df[df["Region"].notna()]
+    countries = list(zip(df["Code"], df["Economy"]))[:country_count]
+    for number in range(len(countries), country_count):
+        countries.append((f"Z{number:05d}", f"Country {number}"))
+    return countries
+
+
+class FakeWorldBankData:
+    """
+    Synthetic indicator data, ordered like the World Bank API orders it: by
+    indicator, then country, then year descending. Records are generated on
+    demand, so large scales don't need the whole data set in memory.
+    """
+
+    def __init__(
+        self,
+        country_count: int = 200,
+        years: tuple[int, int] = (2000, 2023),
+        last_updated: str = "2024-06-28",
+    ):
+        self.countries = get_countries(country_count)
+        self.first_year, self.last_year = years
+        self.last_updated = last_updated
+
+    def get_years(self, date_range: str = None) -> list[int]:
+        first_year, last_year = self.first_year, self.last_year
+        if date_range:
+            start, _, end = date_range.partition(":")
+            first_year = max(first_year, int(start))
+            last_year = min(last_year, int(end or start))
+        return list(range(last_year, first_year - 1, -1))
+
+    def get_record(self, indicators: list[str], years: list[int], index: int) -> dict:
+        country_year_count = len(self.countries) * len(years)
+        indicator = indicators[index // country_year_count]
+        country_code, country_name = self.countries[
+            index % country_year_count // len(years)
+        ]
+        year = years[index % len(years)]
+        # deterministic values, with a gap now and then like the real data
+        seed = zlib.crc32(f"{indicator}{country_code}{year}".encode()) % 100003
+        value = None if seed % 17 == 0 else round(seed / 1000, 3)
+        return {
+            "indicator": {"id": indicator, "value": f"Indicator {indicator}"},
+            "country": {"id": country_code[:2], "value": country_name},
+            "countryiso3code": country_code,
+            "date": str(year),
+            "value": value,
+            "unit": "",
+            "obs_status": "",
+            "decimal": 1,
+        }
+
+    def get_page(
+        self, indicators: list[str], date_range: str, page: int, per_page: int
+    ) -> list:
+        years = self.get_years(date_range)
+        total = len(indicators) * len(self.countries) * len(years)
+        start = (page - 1) * per_page
+        records = [
+            self.get_record(indicators=indicators, years=years, index=index)
+            for index in range(start, min(start + per_page, total))
+        ]
+        metadata = {
+            "page": page,
+            "pages": max(1, -(-total // per_page)),
+            "per_page": per_page,
+            "total": total,
+            "sourceid": "2",
+            "lastupdated": self.last_updated,
+        }
+        return [metadata, records or None]
+
+
+class FakeWorldBankServer:
+    """
+    A local stand-in for the World Bank API indicator endpoint, served from a
+    background thread, e.g.
+
+        with FakeWorldBankServer(data=FakeWorldBankData(country_count=50)) as server:
+            api_client = WorldBankApiClient(base_url=server.base_url)
+
+    Args:
+        data: the synthetic data to serve
+        latency_seconds: delay added to every response, to mimic the network
+        max_per_page: larger pages get the API's invalid parameter error
+    """
+
+    def __init__(
+        self,
+        data: FakeWorldBankData,
+        latency_seconds: float = 0,
+        max_per_page: int = 32768,
+    ):
+        self.data = data
+        self.latency_seconds = latency_seconds
+        self.max_per_page = max_per_page
+        self.request_count = 0
+        self._request_count_lock = threading.Lock()
+        self.http_server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        self.http_server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self.http_server.serve_forever, daemon=True
+        )
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.http_server.server_address
+        return f"http://{host}:{port}/v2"
+
+    def start(self) -> "FakeWorldBankServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.http_server.shutdown()
+        self.http_server.server_close()
+
+    def __enter__(self) -> "FakeWorldBankServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def respond(self, path: str, query: dict) -> tuple[int, list]:
+        """Returns the status code and body of a request."""
+        with self._request_count_lock:
+            self.request_count += 1
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+
+        parts = path.strip("/").split("/")
+        if parts[:4] != ["v2", "countries", "all", "indicators"] or len(parts) != 5:
+            return 404, [{"message": [{"key": "Not found", "value": path}]}]
+
+        per_page = int(query.get("per_page", 50))
+        if per_page > self.max_per_page:
+            return 200, [
+                {
+                    "message": [
+                        {
+                            "id": "120",
+                            "key": "Invalid value",
+                            "value": "The provided parameter value is not valid",
+                        }
+                    ]
+                }
+            ]
+        return 200, self.data.get_page(
+            indicators=parts[4].split(";"),
+            date_range=query.get("date"),
+            page=int(query.get("page", 1)),
+            per_page=per_page,
+        )
+
+    def _make_handler(self):
+        server = self
+
+        class FakeWorldBankHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def do_GET(self):
+                url = urlsplit(self.path)  # urlparse would split the path at ";"
+                query = {
+                    name: values[0] for name, values in parse_qs(url.query).items()
+                }
+                status_code, body = server.respond(path=url.path, query=query)
+                content = json.dumps(body).encode()
+                self.send_response(status_code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass  # keep benchmark output readable
+
+        return FakeWorldBankHandler
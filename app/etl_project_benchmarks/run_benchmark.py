@@ -0,0 +1,307 @@
+"""
+Offline benchmark of the extract, transform, load and transform_sql stages,
+run against a local fake World Bank API, e.g. from the app folder:
+
+    python -m etl_project_benchmarks.run_benchmark --countries 200 --years 2000:2023 --indicators 3
+    python -m etl_project_benchmarks.run_benchmark --database sqlite --save-baseline
+
+Postgres runs use the database of the `.env` file and drop their bench_*
+tables when done. The run is compared to the baseline file if it exists,
+exiting with an error if a stage is slower than the baseline by more than the
+tolerance.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import sqlite3
+import statistics
+import sys
+from pathlib import Path
+from dotenv import load_dotenv
+from etl_project.assets.extract_load_transform import (
+    EXTRACT_FIELDS,
+    get_indicator_table,
+    load,
+    transform,
+    transform_sql,
+)
+from etl_project.assets.pipeline_metrics import PipelineMetrics
+from etl_project.assets.sql_templates import render_sql
+from etl_project.connectors.data_fetcher import fetch_data_from_api
+from etl_project.connectors.world_bank_api import WorldBankApiClient
+from etl_project_benchmarks.fake_world_bank_api import (
+    REGION_FILE_PATH,
+    FakeWorldBankData,
+    FakeWorldBankServer,
+)
+
+STAGES = ["extract", "transform", "load", "transform_sql"]
+BASELINE_FILE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+def run_stages(
+    metrics: PipelineMetrics,
+    api_client: WorldBankApiClient,
+    scale: dict,
+    table_name: str,
+    database,
+    load_method: str,
+) -> None:
+    """Runs every stage for one indicator, recording them in `metrics`."""
+    with metrics.stage("extract") as stage:
+        df_extracted = fetch_data_from_api(
+            indicator=metrics.wb_indicator,
+            date_range=scale["date_range"],
+            max_workers=scale["max_workers"],
+            api_client=api_client,
+            fields=EXTRACT_FIELDS,
+            per_page=scale["per_page"],
+        )
+        stage.rows_out = len(df_extracted)
+
+    with metrics.stage("transform", rows_in=len(df_extracted)) as stage:
+        df_transformed = transform(df_extracted, region_file_path=str(REGION_FILE_PATH))
+        stage.rows_out = len(df_transformed)
+
+    with metrics.stage("load", rows_in=len(df_transformed)) as stage:
+        if isinstance(database, sqlite3.Connection):
+            # the postgres load methods don't apply, load with pandas instead
+            df_transformed.to_sql(
+                table_name, database, index=False, if_exists="replace"
+            )
+        else:
+            table, metadata = get_indicator_table(table_name=table_name, row_hash=True)
+            load(
+                df=df_transformed,
+                postgresql_client=database,
+                table=table,
+                metadata=metadata,
+                load_method=load_method,
+            )
+        stage.rows_out = len(df_transformed)
+
+    with metrics.stage("transform_sql", rows_in=len(df_transformed)):
+        if isinstance(database, sqlite3.Connection):
+            database.execute(f"drop table if exists {table_name}_ranked")
+            database.execute(
+                f"create table {table_name}_ranked as "
+                + render_sql(
+                    "ranked.sql", source_table_name=table_name, metric_name=table_name
+                )
+            )
+        else:
+            transform_sql(table_name=f"{table_name}_ranked", postgresql_client=database)
+
+
+def summarize(runs: list[list[PipelineMetrics]]) -> dict:
+    """
+    Summarizes the stages of every repeat: the median total time of a stage
+    over repeats, the median and worst time of a stage for one indicator,
+    and the rows per second of the median total.
+    """
+    summary = {}
+    for stage in STAGES:
+        totals = []
+        latencies = []
+        for run in runs:
+            stages = [
+                stage_metrics
+                for metrics in run
+                for stage_metrics in metrics.stages
+                if stage_metrics.stage == stage
+            ]
+            totals.append(
+                {
+                    "seconds": sum(s.seconds for s in stages),
+                    "rows_out": sum(s.rows_out or 0 for s in stages),
+                    "rows_in": sum(s.rows_in or 0 for s in stages),
+                    "api_requests": sum(s.api_requests for s in stages),
+                    "api_bytes": sum(s.api_bytes for s in stages),
+                }
+            )
+            latencies.extend(s.seconds for s in stages)
+        seconds = statistics.median(total["seconds"] for total in totals)
+        rows = max(totals[0]["rows_in"], totals[0]["rows_out"])
+        summary[stage] = {
+            "seconds": seconds,
+            "indicator_seconds_median": statistics.median(latencies),
+            "indicator_seconds_max": max(latencies),
+            "rows": rows,
+            "rows_per_second": rows / seconds if seconds else None,
+            "api_requests": totals[0]["api_requests"],
+            "api_bytes": totals[0]["api_bytes"],
+        }
+    return summary
+
+
+def run_benchmark(
+    scale: dict, database_name: str, load_method: str, repeat: int
+) -> dict:
+    """Runs the stages of every indicator `repeat` times and summarizes them."""
+    data = FakeWorldBankData(
+        country_count=scale["countries"],
+        years=tuple(int(year) for year in scale["years"].split(":")),
+    )
+    indicators = [f"BENCH.IND.{number}" for number in range(scale["indicators"])]
+    table_names = [f"bench_ind_{number}" for number in range(scale["indicators"])]
+    if database_name == "sqlite":
+        database = sqlite3.connect(":memory:")
+    else:
+        load_dotenv()
+        # imported here so sqlite runs don't need the pipeline's dependencies
+        from etl_project.pipelines.global_economic_monitor import (
+            get_postgresql_client,
+        )
+
+        database = get_postgresql_client()
+
+    def drop_tables():
+        for table_name in table_names:
+            for name in (table_name, f"{table_name}_ranked"):
+                if isinstance(database, sqlite3.Connection):
+                    database.execute(f"drop table if exists {name}")
+                else:
+                    database.drop_table(name)
+
+    runs = []
+    with FakeWorldBankServer(
+        data=data, latency_seconds=scale["latency_ms"] / 1000
+    ) as server:
+        api_client = WorldBankApiClient(base_url=server.base_url)
+        try:
+            for _ in range(repeat):
+                drop_tables()  # every repeat loads into new tables
+                run = []
+                for wb_indicator, table_name in zip(indicators, table_names):
+                    metrics = PipelineMetrics(
+                        pipeline_name="benchmark", wb_indicator=wb_indicator
+                    )
+                    # the stages print progress, which would drown the report
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run_stages(
+                            metrics=metrics,
+                            api_client=api_client,
+                            scale=scale,
+                            table_name=table_name,
+                            database=database,
+                            load_method=load_method,
+                        )
+                    run.append(metrics)
+                runs.append(run)
+        finally:
+            drop_tables()
+            api_client.close()
+
+    return {
+        "scale": scale,
+        "database": database_name,
+        "load_method": load_method if database_name != "sqlite" else "to_sql",
+        "repeat": repeat,
+        "stages": summarize(runs),
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns a message for each stage slower than the baseline by more than `tolerance`."""
+    regressions = []
+    for stage, stage_summary in results["stages"].items():
+        baseline_seconds = baseline["stages"].get(stage, {}).get("seconds")
+        if not baseline_seconds:
+            continue
+        change = stage_summary["seconds"] / baseline_seconds - 1
+        if change > tolerance:
+            regressions.append(
+                f"{stage}: {stage_summary['seconds']:.3f}s vs {baseline_seconds:.3f}s "
+                f"in the baseline ({change:+.0%})"
+            )
+    return regressions
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    print(
+        f"{'stage':<14}{'seconds':>10}{'rows/s':>12}{'p50 s':>10}{'max s':>10}"
+        f"{'requests':>10}{'MB':>8}{'baseline s':>12}"
+    )
+    for stage, stage_summary in results["stages"].items():
+        baseline_seconds = (
+            baseline["stages"].get(stage, {}).get("seconds") if baseline else None
+        )
+        rows_per_second = stage_summary["rows_per_second"]
+        print(
+            f"{stage:<14}{stage_summary['seconds']:>10.3f}"
+            f"{rows_per_second if rows_per_second is not None else 0:>12,.0f}"
+            f"{stage_summary['indicator_seconds_median']:>10.3f}"
+            f"{stage_summary['indicator_seconds_max']:>10.3f}"
+            f"{stage_summary['api_requests']:>10}"
+            f"{stage_summary['api_bytes'] / 1e6:>8.1f}"
+            f"{baseline_seconds if baseline_seconds is not None else float('nan'):>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--countries", type=int, default=200)
+    parser.add_argument("--years", default="2000:2023", help="first:last year served")
+    parser.add_argument("--indicators", type=int, default=3)
+    parser.add_argument("--date-range", default=None, help="defaults to --years")
+    parser.add_argument("--per-page", default="adaptive")
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument(
+        "--latency-ms", type=float, default=0, help="added to every api response"
+    )
+    parser.add_argument("--database", choices=["postgres", "sqlite"], default="sqlite")
+    parser.add_argument(
+        "--load-method", choices=["insert", "upsert", "copy"], default="copy"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_FILE_PATH)
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="store this run as the baseline"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed slowdown, 0.2 is 20%%"
+    )
+    args = parser.parse_args()
+
+    scale = {
+        "countries": args.countries,
+        "years": args.years,
+        "indicators": args.indicators,
+        "date_range": args.date_range or args.years,
+        "per_page": int(args.per_page) if args.per_page.isdigit() else args.per_page,
+        "max_workers": args.max_workers,
+        "latency_ms": args.latency_ms,
+    }
+    results = run_benchmark(
+        scale=scale,
+        database_name=args.database,
+        load_method=args.load_method,
+        repeat=args.repeat,
+    )
+
+    baseline = None
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if (baseline["scale"], baseline["database"], baseline["load_method"]) != (
+            results["scale"],
+            results["database"],
+            results["load_method"],
+        ):
+            print(f"Baseline {args.baseline} was run with other settings, ignoring it")
+            baseline = None
+
+    print_results(results=results, baseline=baseline)
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2))
+        print(f"Saved baseline to {args.baseline}")
+    elif baseline is not None:
+        regressions = compare_to_baseline(
+            results=results, baseline=baseline, tolerance=args.tolerance
+        )
+        for regression in regressions:
+            print(f"Regression in {regression}")
+        if regressions:
+            sys.exit(1)
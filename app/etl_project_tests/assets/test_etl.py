@@ -1,5 +1,5 @@
 import os
-from etl_project.assets.extract_load_transform import extract, transform
+from etl_project.assets.extract_load_transform import add_row_hash, extract, transform
 import pytest
 from dotenv import load_dotenv
 import pandas as pd
@@ -116,7 +116,17 @@ def setup_transformed_gem_df():
     ]
 
     df = pd.DataFrame(data)
-    df["year"] = df["year"].astype("int64")
+    df = df.astype(
+        {
+            "year": "int16",
+            "country_code": "category",
+            "country_name": "category",
+            "indicator_id": "category",
+            "indicator_value": "category",
+            "value": "float64",
+            "region": "category",
+        }
+    )
     return df
 
 
@@ -125,3 +135,21 @@ def test_transform(setup_input_GEM_df, setup_transformed_gem_df):
     expected_df = setup_transformed_gem_df
     df = transform(df=setup_input_GEM_df, region_file_path=region_file_path)
     pd.testing.assert_frame_equal(left=df, right=expected_df, check_exact=True)
+
+
+def test_add_row_hash(setup_transformed_gem_df):
+    key_columns = ["year", "country_code"]
+    df = add_row_hash(df=setup_transformed_gem_df, key_columns=key_columns)
+
+    # the hash doesn't depend on the dtypes, only on the values
+    df_object = add_row_hash(
+        df=setup_transformed_gem_df.astype({"region": "object"}),
+        key_columns=key_columns,
+    )
+    pd.testing.assert_series_equal(df["row_hash"], df_object["row_hash"])
+
+    df_revised = setup_transformed_gem_df.copy()
+    df_revised.loc[0, "value"] = 3.5
+    df_revised = add_row_hash(df=df_revised, key_columns=key_columns)
+    assert df_revised["row_hash"][0] != df["row_hash"][0]
+    assert (df_revised["row_hash"][1:] == df["row_hash"][1:]).all()
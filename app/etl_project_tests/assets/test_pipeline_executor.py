@@ -0,0 +1,84 @@
+import asyncio
+import threading
+from etl_project.assets.metadata_logging import MetaDataLoggingStatus
+from etl_project.assets.pipeline_executor import (
+    ResourceLimits,
+    run_concurrently,
+    run_in_parallel,
+)
+
+
+def test_run_in_parallel():
+    # both pipelines must be running at the same time to get past the barrier
+    barrier = threading.Barrier(2, timeout=5)
+
+    def slow_pipeline():
+        barrier.wait()
+        return MetaDataLoggingStatus.RUN_SUCCESS
+
+    def failing_pipeline():
+        raise ValueError("api unavailable")
+
+    results = run_in_parallel(
+        pipelines={
+            "gdp": slow_pipeline,
+            "cpi": failing_pipeline,
+            "unemployment": slow_pipeline,
+        },
+        max_workers=3,
+    )
+
+    assert list(results.keys()) == ["gdp", "cpi", "unemployment"]
+    assert results["gdp"].status == MetaDataLoggingStatus.RUN_SUCCESS
+    assert results["unemployment"].status == MetaDataLoggingStatus.RUN_SUCCESS
+    assert results["cpi"].status == MetaDataLoggingStatus.RUN_FAILURE
+    assert isinstance(results["cpi"].error, ValueError)
+
+
+def test_run_concurrently_bounds_each_resource():
+    limits = ResourceLimits(api=1, db=1, cpu=1)
+    running = {"api": 0, "db": 0}
+    peak = {"api": 0, "db": 0}
+    events = []
+    lock = threading.Lock()
+    second_api_started = threading.Event()
+
+    def stage(resource):
+        with lock:
+            running[resource] += 1
+            peak[resource] = max(peak[resource], running[resource])
+            events.append(("start", resource))
+            if events.count(("start", "api")) == 2:
+                second_api_started.set()
+        if resource == "db":
+            # holds the db slot until the next api stage starts
+            second_api_started.wait(timeout=5)
+        with lock:
+            running[resource] -= 1
+            events.append(("end", resource))
+
+    async def good_pipeline():
+        await limits.run("api", stage, "api")
+        await limits.run("db", stage, "db")
+        return MetaDataLoggingStatus.RUN_SUCCESS
+
+    async def failing_pipeline():
+        raise ValueError("api unavailable")
+
+    results = asyncio.run(
+        run_concurrently(
+            pipelines={
+                "gdp": good_pipeline,
+                "cpi": failing_pipeline,
+                "unemployment": good_pipeline,
+            }
+        )
+    )
+
+    assert results["gdp"].status == MetaDataLoggingStatus.RUN_SUCCESS
+    assert results["unemployment"].status == MetaDataLoggingStatus.RUN_SUCCESS
+    assert isinstance(results["cpi"].error, ValueError)
+    assert peak == {"api": 1, "db": 1}
+    # the second api stage starts before the first db stage ends
+    api_starts = [i for i, event in enumerate(events) if event == ("start", "api")]
+    assert api_starts[1] < events.index(("end", "db"))
@@ -0,0 +1,45 @@
+import logging
+from etl_project.assets.pipeline_logging import PipelineLogging, RingBufferHandler
+
+
+def test_pipeline_logging_runs_are_isolated(tmp_path):
+    first_run = PipelineLogging(pipeline_name="gem_cpi", log_folder_path=tmp_path)
+    second_run = PipelineLogging(pipeline_name="gem_cpi", log_folder_path=tmp_path)
+    first_run.logger.info("first run")
+    second_run.logger.info("second run")
+    first_run.close()
+    second_run.close()
+
+    assert "first run" in first_run.get_logs()
+    assert "second run" not in first_run.get_logs()
+    assert "second run" in second_run.get_logs()
+    assert first_run.logger.handlers == []
+
+
+def test_ring_buffer_drops_oldest_lines(tmp_path):
+    for compress in (False, True):
+        pipeline_logging = PipelineLogging(
+            pipeline_name="gem_gdp",
+            log_folder_path=tmp_path,
+            max_buffer_bytes=4096,
+            compress=compress,
+        )
+        for number in range(1000):
+            pipeline_logging.logger.info(f"line {number}")
+        pipeline_logging.close()
+
+        logs = pipeline_logging.get_logs()
+        handler = pipeline_logging.buffer_handler
+        assert logs.startswith(f"... {handler.dropped_lines} earlier lines dropped")
+        assert logs.endswith("line 999\n")
+        assert "line 0\n" not in logs
+        # every line is either kept or counted as dropped
+        assert handler.dropped_lines + logs.count("\n") - 1 == 1000
+        if not compress:
+            assert len(logs) < 4096 + 100
+
+
+def test_ring_buffer_keeps_short_runs_whole():
+    handler = RingBufferHandler(max_bytes=1024, compress=True)
+    handler.handle(logging.makeLogRecord({"msg": "only line"}))
+    assert handler.get_logs() == "only line\n"
@@ -0,0 +1,66 @@
+import time
+import pytest
+from etl_project.assets.pipeline_metrics import (
+    PipelineMetrics,
+    get_rss_bytes,
+    write_prometheus_file,
+)
+from etl_project.connectors.data_fetcher import fetch_data_from_api
+
+
+def paged(params, headers):
+    """Answers every request with a page of 10 records out of 4 pages."""
+    page = params["page"]
+    return (
+        200,
+        [
+            {"page": page, "pages": 4, "per_page": 10, "total": 40},
+            [{"date": "2023", "value": page * 10 + i} for i in range(10)],
+        ],
+        {},
+    )
+
+
+def test_stage_counts_requests_of_page_threads(make_api_client, tmp_path):
+    api_client = make_api_client(paged)
+    metrics = PipelineMetrics(pipeline_name="gem", wb_indicator="SL.UEM.TOTL.ZS")
+
+    with metrics.stage("extract") as stage:
+        df = fetch_data_from_api(
+            indicator="SL.UEM.TOTL.ZS",
+            date_range="2023:2023",
+            api_client=api_client,
+            per_page=10,
+        )
+        stage.rows_out = len(df)
+
+    stage_metrics = metrics.to_dicts()[0]
+    # pages 2 to 4 are fetched by a thread pool
+    assert stage_metrics["api_requests"] == 4
+    assert stage_metrics["api_bytes"] > 0
+    assert stage_metrics["rows_out"] == 40
+    assert stage_metrics["seconds"] > 0
+
+    prometheus_file = tmp_path / "metrics.prom"
+    write_prometheus_file(metrics=metrics, file_path=str(prometheus_file))
+    assert (
+        'pipeline_stage_api_requests{pipeline="gem",wb_indicator="SL.UEM.TOTL.ZS",stage="extract"} 4'
+        in prometheus_file.read_text()
+    )
+
+
+@pytest.mark.skipif(get_rss_bytes() is None, reason="needs /proc/self/statm")
+def test_stage_records_its_own_peak_memory():
+    metrics = PipelineMetrics(pipeline_name="gem", wb_indicator="SL.UEM.TOTL.ZS")
+
+    with metrics.stage("transform"):
+        data = b"x" * 200 * 1024**2
+        time.sleep(0.2)
+        del data
+    with metrics.stage("load"):
+        time.sleep(0.2)
+
+    transform, load = metrics.to_dicts()
+    assert transform["peak_rss_bytes"] - transform["start_rss_bytes"] > 100 * 1024**2
+    # not the peak of the process so far, which the transform stage set
+    assert load["peak_rss_bytes"] < transform["peak_rss_bytes"] - 100 * 1024**2
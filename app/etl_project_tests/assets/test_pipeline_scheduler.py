@@ -0,0 +1,57 @@
+import datetime
+import threading
+from etl_project.assets.pipeline_scheduler import PipelineScheduler
+from etl_project.pipelines.global_economic_monitor import get_job_schedule
+
+
+def make_due(pipeline_scheduler: PipelineScheduler) -> None:
+    for job in pipeline_scheduler.scheduler.get_jobs():
+        job.next_run = datetime.datetime.now() - datetime.timedelta(seconds=1)
+
+
+def test_job_is_skipped_while_previous_run_is_running():
+    pipeline_scheduler = PipelineScheduler(max_workers=2)
+    release = threading.Event()
+    started = []
+
+    def blocking_job():
+        started.append(1)
+        release.wait(timeout=5)
+
+    pipeline_scheduler.add_job(
+        name="gdp", job_func=blocking_job, schedule_config={"interval_seconds": 60}
+    )
+    make_due(pipeline_scheduler)
+    pipeline_scheduler.scheduler.run_pending()
+    make_due(pipeline_scheduler)
+    pipeline_scheduler.scheduler.run_pending()  # the first run is still blocked
+
+    release.set()
+    pipeline_scheduler.executor.shutdown(wait=True)
+    assert started == [1]
+    assert pipeline_scheduler._running_jobs == set()
+
+
+def test_indicator_schedules_override_the_default():
+    schedule_config = {
+        "default": {"interval_seconds": 3600},
+        "indicators": {"gdp": {"at": "02:00"}, "cpi": {"every": "monday"}},
+    }
+    pipeline_scheduler = PipelineScheduler()
+    for table_name in ["gdp", "cpi", "unemployment"]:
+        pipeline_scheduler.add_job(
+            name=table_name,
+            job_func=lambda: None,
+            schedule_config=get_job_schedule(
+                schedule_config=schedule_config, extract_table_name=table_name
+            ),
+        )
+
+    gdp, cpi, unemployment = pipeline_scheduler.scheduler.get_jobs()
+    assert (gdp.unit, gdp.at_time) == ("days", datetime.time(2, 0))
+    assert (cpi.unit, cpi.start_day, cpi.at_time) == (
+        "weeks",
+        "monday",
+        datetime.time(0, 0),
+    )
+    assert (unemployment.unit, unemployment.interval) == ("seconds", 3600)
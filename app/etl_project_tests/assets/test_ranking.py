@@ -0,0 +1,43 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+import pytest
+from etl_project.assets.ranking import rank_indicator
+from etl_project.assets.sql_templates import render_sql
+
+
+@pytest.fixture
+def setup_indicator_df():
+    rng = np.random.default_rng(seed=42)
+    regions = ["East Asia & Pacific", "Europe & Central Asia", "South Asia", np.nan]
+    data = [
+        {
+            "year": year,
+            "country_code": f"C{country:02d}",
+            "country_name": f"Country {country}",
+            "indicator_id": "SL.UEM.TOTL.ZS",
+            "indicator_value": "Unemployment, total (% of total labor force) (modeled ILO estimate)",
+            # round so that some values tie within a year
+            "value": round(float(rng.uniform(0, 10)), 0),
+            "region": regions[country % len(regions)],
+        }
+        for year in range(2015, 2021)
+        for country in range(40)
+    ]
+    return pd.DataFrame(data)
+
+
+def test_rank_indicator_matches_ranked_sql(setup_indicator_df):
+    connection = sqlite3.connect(":memory:")
+    # the base table stores missing regions as 'nan', like the postgres load does
+    setup_indicator_df.fillna({"region": "nan"}).to_sql(
+        "unemployment", connection, index=False
+    )
+    ranked_sql = render_sql(
+        "ranked.sql", source_table_name="unemployment", metric_name="unemployment"
+    )
+    expected_df = pd.read_sql(ranked_sql, connection)
+
+    df = rank_indicator(setup_indicator_df, metric_name="unemployment")
+
+    pd.testing.assert_frame_equal(left=df, right=expected_df, check_exact=False)
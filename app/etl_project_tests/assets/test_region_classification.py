@@ -0,0 +1,31 @@
+import os
+import pandas as pd
+from etl_project.assets.region_classification import get_region_classification
+
+
+def test_get_region_classification_reloads_modified_file(tmp_path):
+    file_path = tmp_path / "CLASS_CSV.csv"
+    file_path.write_text(
+        "Economy,Code,Region,Income group,Lending category\n"
+        "Singapore,SGP,East Asia & Pacific,High income,\n"
+        "World,WLD,,,\n"
+    )
+
+    region_classification = get_region_classification(str(file_path))
+    assert get_region_classification(str(file_path)) is region_classification
+    country_codes = pd.Series(["SGP", "WLD", "XXX"])
+    assert region_classification.contains(country_codes).tolist() == [True, True, False]
+    assert region_classification.region["SGP"] == "East Asia & Pacific"
+    assert region_classification.income_group["SGP"] == "High income"
+    assert pd.isna(region_classification.region["WLD"])
+
+    file_path.write_text(
+        "Economy,Code,Region,Income group,Lending category\n"
+        "Singapore,SGP,Asia,High income,\n"
+    )
+    modified_time = os.stat(file_path).st_mtime_ns + 1_000_000_000
+    os.utime(file_path, ns=(modified_time, modified_time))
+
+    reloaded_classification = get_region_classification(str(file_path))
+    assert reloaded_classification is not region_classification
+    assert reloaded_classification.region["SGP"] == "Asia"
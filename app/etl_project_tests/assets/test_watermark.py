@@ -0,0 +1,108 @@
+import pytest
+from etl_project.assets import extract_load_transform
+from etl_project.assets.extract_load_transform import (
+    get_extract_date_range,
+    update_watermark,
+)
+
+
+class FakeWatermarkStore:
+    """Keeps watermarks in a dict shared by every instance, like the table."""
+
+    watermarks = {}
+
+    def __init__(self, postgresql_client):
+        pass
+
+    def get(self, wb_indicator: str) -> dict:
+        return self.watermarks.get(wb_indicator)
+
+    def save(self, wb_indicator, last_year, last_updated, lookback_years) -> None:
+        self.watermarks[wb_indicator] = {
+            "wb_indicator": wb_indicator,
+            "last_year": last_year,
+            "last_updated": last_updated,
+            "lookback_years": lookback_years,
+        }
+
+
+class FakePostgreSqlClient:
+    """A database with the unemployment table loaded up to 2021."""
+
+    def __init__(self):
+        self.queries = []
+
+    def table_exists(self, table_name: str) -> bool:
+        return table_name == "unemployment"
+
+    def run_sql(self, sql) -> list[dict]:
+        self.queries.append(str(sql))
+        return [{"incremental_value": 2021}]
+
+
+# the lastupdated dates the World Bank reports on each run
+LAST_UPDATED = ["2024-06-28", "2024-06-28", "2024-09-19"]
+
+
+def fake_fetch_last_updated(run: int) -> str:
+    return LAST_UPDATED[run]
+
+
+@pytest.fixture
+def postgresql_client(monkeypatch) -> FakePostgreSqlClient:
+    FakeWatermarkStore.watermarks = {}
+    monkeypatch.setattr(extract_load_transform, "WatermarkStore", FakeWatermarkStore)
+    return FakePostgreSqlClient()
+
+
+def get_date_range(postgresql_client, table_name: str, run: int) -> str:
+    return get_extract_date_range(
+        postgresql_client=postgresql_client,
+        extract_type="incremental",
+        incremental_column="year",
+        table_name=table_name,
+        wb_daterange="2015:2023",
+        wb_indicator="SL.UEM.TOTL.ZS",
+        last_updated=fake_fetch_last_updated(run),
+        lookback_years=2,
+    )
+
+
+def test_first_run_without_table_uses_configured_range(postgresql_client):
+    assert get_date_range(postgresql_client, table_name="cpi", run=0) == "2015:2023"
+    assert postgresql_client.queries == []
+
+
+def test_incremental_runs_follow_the_watermark(postgresql_client):
+    # seeded once from the max year of the table, without a lastupdated date
+    assert get_date_range(postgresql_client, "unemployment", run=0) == "2020:2022"
+    update_watermark(
+        postgresql_client=postgresql_client,
+        wb_indicator="SL.UEM.TOTL.ZS",
+        years_loaded=[2020, 2021],
+        last_updated=fake_fetch_last_updated(0),
+        lookback_years=2,
+    )
+
+    # lastupdated unchanged: only the next year, without scanning the table
+    assert get_date_range(postgresql_client, "unemployment", run=1) == "2022:2022"
+    assert len(postgresql_client.queries) == 1
+
+    # lastupdated changed: the indicator's own look-back window is refetched
+    FakeWatermarkStore.watermarks["SL.UEM.TOTL.ZS"]["lookback_years"] = 4
+    assert get_date_range(postgresql_client, "unemployment", run=2) == "2018:2022"
+
+
+def test_update_watermark_keeps_the_stored_lookback(postgresql_client):
+    for years_loaded, lookback_years in [([2021], 2), ([2022], 5), ([], 5)]:
+        update_watermark(
+            postgresql_client=postgresql_client,
+            wb_indicator="SL.UEM.TOTL.ZS",
+            years_loaded=years_loaded,
+            last_updated="2024-06-28",
+            lookback_years=lookback_years,
+        )
+
+    watermark = FakeWatermarkStore.watermarks["SL.UEM.TOTL.ZS"]
+    assert watermark["last_year"] == 2022
+    assert watermark["lookback_years"] == 2
@@ -0,0 +1,43 @@
+import json
+from typing import Callable
+import pytest
+import requests
+from etl_project.connectors.world_bank_api import WorldBankApiClient
+
+
+class FakeSession:
+    """
+    Stands in for the `requests.Session` of a `WorldBankApiClient`, without a
+    network. `respond(params, headers)` answers each request with a status
+    code, a json body and response headers, or raises. The sent requests are
+    kept in `requests`.
+    """
+
+    def __init__(self, respond: Callable[[dict, dict], tuple]):
+        self.respond = respond
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, timeout=None):
+        params, headers = params or {}, headers or {}
+        self.requests.append({"url": url, "params": params, "headers": headers})
+        status_code, body, response_headers = self.respond(params, headers)
+        response = requests.Response()
+        response.status_code = status_code
+        response.headers.update(response_headers)
+        response._content = b"" if body is None else json.dumps(body).encode()
+        return response
+
+
+@pytest.fixture
+def make_api_client() -> Callable[..., WorldBankApiClient]:
+    """
+    Returns a factory of World Bank api clients answered by a `FakeSession`,
+    e.g. `make_api_client(respond, max_retries=2)`.
+    """
+
+    def make(respond: Callable[[dict, dict], tuple], **client_config):
+        api_client = WorldBankApiClient(**client_config)
+        api_client.session = FakeSession(respond)
+        return api_client
+
+    return make
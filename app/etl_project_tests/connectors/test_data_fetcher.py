@@ -0,0 +1,85 @@
+import math
+import requests
+from etl_project.connectors.data_fetcher import fetch_data_from_api, iter_pages
+from etl_project.connectors.world_bank_api import WorldBankApiClient
+from etl_project_benchmarks.fake_world_bank_api import (
+    FakeWorldBankData,
+    FakeWorldBankServer,
+)
+
+
+class FakeWorldBankApiClient:
+    """Serves `total` records in pages, failing pages larger than `max_per_page`."""
+
+    def __init__(self, total: int, max_per_page: int):
+        self.records = [{"date": str(i), "value": i} for i in range(total)]
+        self.max_per_page = max_per_page
+        self.requests = []
+
+    def get_json(self, path: str, params: dict = None):
+        page, per_page = params["page"], params["per_page"]
+        self.requests.append((page, per_page))
+        if per_page > self.max_per_page:
+            raise requests.HTTPError("502 Server Error: Bad Gateway")
+        metadata = {
+            "page": page,
+            "pages": math.ceil(len(self.records) / per_page),
+            "per_page": per_page,
+            "total": len(self.records),
+        }
+        return [metadata, self.records[(page - 1) * per_page : page * per_page]]
+
+
+def test_iter_pages_adaptive():
+    api_client = FakeWorldBankApiClient(total=20000, max_per_page=20000)
+
+    records = [
+        record
+        for page_records in iter_pages(
+            indicator="NY.GDP.MKTP.CD",
+            date_range="2019:2021",
+            max_workers=8,
+            api_client=api_client,
+        )
+        for record in page_records
+    ]
+
+    assert records == api_client.records
+    # a one row request for the total, then pages of 4096 rows
+    assert api_client.requests[0] == (1, 1)
+    assert len(api_client.requests) == 1 + 5
+
+
+def test_iter_pages_retries_smaller_pages():
+    api_client = FakeWorldBankApiClient(total=1000, max_per_page=100)
+
+    records = [
+        record
+        for page_records in iter_pages(
+            indicator="NY.GDP.MKTP.CD",
+            date_range="2019:2021",
+            api_client=api_client,
+            per_page=512,
+        )
+        for record in page_records
+    ]
+
+    assert records == api_client.records
+    # page 1 shrinks to 64 rows, and every later page is fetched with 64 rows
+    assert {per_page for _, per_page in api_client.requests[3:]} == {64}
+
+
+def test_fetch_data_from_fake_server():
+    data = FakeWorldBankData(country_count=30, years=(2015, 2023))
+    with FakeWorldBankServer(data=data, max_per_page=2048) as server:
+        api_client = WorldBankApiClient(base_url=server.base_url)
+        df = fetch_data_from_api(
+            indicator="SL.UEM.TOTL.ZS;NY.GDP.MKTP.CD",
+            date_range="2019:2023",
+            api_client=api_client,
+            source=2,
+            per_page=4096,
+        )
+
+    assert len(df) == 2 * 30 * 5
+    assert not df.duplicated(["indicator.id", "countryiso3code", "date"]).any()
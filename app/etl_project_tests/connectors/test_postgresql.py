@@ -0,0 +1,10 @@
+from etl_project.connectors.postgresql import to_csv_field
+
+
+def test_to_csv_field_keeps_empty_strings_apart_from_null():
+    assert to_csv_field(None) == "\\N"
+    assert to_csv_field("") == '""'
+    assert to_csv_field("\\N") == '"\\N"'
+    assert to_csv_field('Korea, "Rep."') == '"Korea, ""Rep."""'
+    assert to_csv_field(2021) == "2021"
+    assert to_csv_field(1.5) == "1.5"
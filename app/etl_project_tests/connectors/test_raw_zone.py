@@ -0,0 +1,47 @@
+import pandas as pd
+import pytest
+from etl_project.connectors.raw_zone import RawZone
+
+
+def make_rows(years: list[str], value: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"date": year, "countryiso3code": country, "value": value}
+            for country in ["AUS", "NZL"]
+            for year in years
+        ]
+    )
+
+
+def test_raw_zone_replaces_extracted_years(tmp_path):
+    raw_zone = RawZone(base_path=tmp_path)
+    raw_zone.write("SL.UEM.TOTL.ZS", make_rows(["2021", "2020", "2019"], 1.0))
+
+    # a later extract of two years, in chunks, with a year of nulls
+    with raw_zone.writer("SL.UEM.TOTL.ZS") as writer:
+        writer.write(make_rows(["2021"], None))
+        writer.write(make_rows(["2020"], 2.0))
+
+    assert raw_zone.get_years("SL.UEM.TOTL.ZS") == [2019, 2020, 2021]
+    df = raw_zone.read("SL.UEM.TOTL.ZS", date_range="2020:2021")
+    assert sorted(df["date"].unique()) == ["2020", "2021"]
+    assert len(df) == 4
+    assert df[df["date"] == "2020"]["value"].tolist() == [2.0, 2.0]
+    assert df[df["date"] == "2021"]["value"].isna().all()
+    assert len(raw_zone.read("SL.UEM.TOTL.ZS")) == 6
+    assert raw_zone.read("FP.CPI.TOTL").empty
+
+
+def test_raw_zone_keeps_snapshot_of_failed_extract(tmp_path):
+    raw_zone = RawZone(base_path=tmp_path)
+    raw_zone.write("FP.CPI.TOTL", make_rows(["2021"], 1.0))
+
+    with pytest.raises(ConnectionError):
+        with raw_zone.writer("FP.CPI.TOTL") as writer:
+            writer.write(make_rows(["2021"], 2.0))
+            raise ConnectionError("api unavailable")
+
+    assert raw_zone.read("FP.CPI.TOTL")["value"].tolist() == [1.0, 1.0]
+    assert [
+        path.name for path in (tmp_path / "wb_indicator=FP.CPI.TOTL").iterdir()
+    ] == ["year=2021"]
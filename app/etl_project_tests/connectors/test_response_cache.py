@@ -0,0 +1,118 @@
+import json
+import os
+from etl_project.connectors.data_fetcher import fetch_last_updated
+from etl_project.connectors.response_cache import ResponseCache
+
+
+def revalidated(body: list):
+    """Answers with `body` and an ETag, or 304 when the request has that ETag."""
+
+    def respond(params, headers):
+        response_headers = {
+            "ETag": '"v1"',
+            "Last-Modified": "Fri, 28 Jun 2024 00:00:00 GMT",
+        }
+        if headers.get("If-None-Match") == '"v1"':
+            return 304, None, response_headers
+        return 200, body, response_headers
+
+    return respond
+
+
+def expire(response_cache: ResponseCache, key: str) -> None:
+    entry = response_cache.get(key)
+    entry["fetched_at"] -= response_cache.ttl_seconds + 1
+    with open(response_cache._entry_path(key), "w") as file:
+        json.dump(entry, file)
+
+
+def test_fresh_entries_are_served_without_a_request(make_api_client, tmp_path):
+    response_cache = ResponseCache(cache_dir=tmp_path, ttl_seconds=3600)
+    api_client = make_api_client(
+        revalidated([{"page": 1}, []]), response_cache=response_cache
+    )
+
+    first = api_client.get_json("countries/all/indicators/FP.CPI.TOTL", {"page": 1})
+    second = api_client.get_json("countries/all/indicators/FP.CPI.TOTL", {"page": 1})
+
+    assert first == second == [{"page": 1}, []]
+    assert len(api_client.session.requests) == 1
+
+
+def test_expired_entries_are_revalidated(make_api_client, tmp_path):
+    response_cache = ResponseCache(cache_dir=tmp_path, ttl_seconds=3600)
+    api_client = make_api_client(
+        revalidated([{"page": 1}, []]), response_cache=response_cache
+    )
+    path, params = "countries/all/indicators/FP.CPI.TOTL", {"page": 1}
+    api_client.get_json(path, params)
+    key = response_cache.make_key(path=path, params=params)
+
+    for _ in range(3):
+        expire(response_cache, key)
+        assert not response_cache.is_fresh(response_cache.get(key))
+        assert api_client.get_json(path, params) == [{"page": 1}, []]
+        # the 304 marks the entry fresh again
+        assert response_cache.is_fresh(response_cache.get(key))
+
+    revalidations = [request["headers"] for request in api_client.session.requests[1:]]
+    assert len(revalidations) == 3
+    assert all(headers["If-None-Match"] == '"v1"' for headers in revalidations)
+    assert all(
+        headers["If-Modified-Since"] == "Fri, 28 Jun 2024 00:00:00 GMT"
+        for headers in revalidations
+    )
+    # rewriting an entry replaces its size instead of adding to it
+    assert response_cache._size_bytes == sum(
+        entry_path.stat().st_size for entry_path in tmp_path.glob("*.json")
+    )
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    response_cache = ResponseCache(cache_dir=tmp_path, max_size_bytes=10**6)
+    for number in range(3):
+        response_cache.set(key=f"entry{number}", body="x" * 1000)
+        # entry0 is the least recently used
+        os.utime(response_cache._entry_path(f"entry{number}"), (number, number))
+    response_cache.get("entry0")  # now the most recently used
+
+    response_cache.max_size_bytes = 1500
+    response_cache.set(key="entry3", body="x" * 10)
+
+    assert response_cache.get("entry1") is None
+    assert response_cache.get("entry2") is None
+    assert response_cache.get("entry0") is not None
+    assert response_cache.get("entry3") is not None
+    assert response_cache._size_bytes <= response_cache.max_size_bytes
+
+
+def test_fetch_last_updated_bypasses_the_cache(make_api_client, tmp_path):
+    response_cache = ResponseCache(cache_dir=tmp_path, ttl_seconds=3600)
+    api_client = make_api_client(
+        revalidated([{"page": 1, "lastupdated": "2024-06-28"}, []]),
+        response_cache=response_cache,
+    )
+
+    for _ in range(2):
+        assert (
+            fetch_last_updated(indicator="FP.CPI.TOTL", api_client=api_client)
+            == "2024-06-28"
+        )
+
+    assert len(api_client.session.requests) == 2
+    assert list(tmp_path.glob("*.json")) == []
+
+
+def test_error_bodies_are_not_cached(make_api_client, tmp_path):
+    response_cache = ResponseCache(cache_dir=tmp_path, ttl_seconds=3600)
+    error_body = [{"message": [{"id": "120", "key": "Invalid value"}]}]
+    api_client = make_api_client(revalidated(error_body), response_cache=response_cache)
+    path, params = "countries/all/indicators/FP.CPI.TOTL", {"page": 1}
+
+    for _ in range(2):
+        assert api_client.get_json(path, params) == error_body
+
+    # both polls reach the API, the error isn't served from the cache
+    assert len(api_client.session.requests) == 2
+    assert all(request["headers"] == {} for request in api_client.session.requests)
+    assert list(tmp_path.glob("*.json")) == []
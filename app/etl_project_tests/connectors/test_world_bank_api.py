@@ -0,0 +1,111 @@
+import pytest
+import requests
+from etl_project.connectors import world_bank_api
+from etl_project.connectors.world_bank_api import WorldBankApiClient
+
+
+def in_order(responses: list):
+    """Answers requests with the given status codes and headers, in order."""
+    responses = list(responses)
+
+    def respond(params, headers):
+        outcome = responses.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status_code, response_headers = outcome
+        return status_code, [], response_headers
+
+    return respond
+
+
+@pytest.fixture
+def sleeps(monkeypatch) -> list[float]:
+    """Records the waits of the client instead of sleeping."""
+    waits = []
+    monkeypatch.setattr(world_bank_api.time, "sleep", waits.append)
+    return waits
+
+
+@pytest.fixture
+def make_retrying_client(make_api_client):
+    def make(responses: list, max_retries: int = 4) -> WorldBankApiClient:
+        return make_api_client(
+            in_order(responses),
+            max_retries=max_retries,
+            backoff_factor=0.5,
+            backoff_max=30,
+        )
+
+    return make
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 502, 503, 504])
+def test_retryable_status_codes_are_retried(make_retrying_client, sleeps, status_code):
+    api_client = make_retrying_client([(status_code, {}), (status_code, {}), (200, {})])
+
+    response = api_client.get("countries/all/indicators/FP.CPI.TOTL")
+
+    assert response.status_code == 200
+    assert len(api_client.session.requests) == 3
+    assert len(sleeps) == 2
+
+
+def test_other_errors_are_not_retried(make_retrying_client, sleeps):
+    api_client = make_retrying_client([(404, {})])
+
+    with pytest.raises(requests.HTTPError):
+        api_client.get("countries/all/indicators/UNKNOWN")
+
+    assert len(api_client.session.requests) == 1
+    assert sleeps == []
+
+
+def test_connection_errors_are_retried(make_retrying_client, sleeps):
+    api_client = make_retrying_client([requests.ConnectionError("reset"), (200, {})])
+
+    assert api_client.get("countries/all/indicators/FP.CPI.TOTL").status_code == 200
+    assert len(sleeps) == 1
+
+
+def test_gives_up_after_max_retries(make_retrying_client, sleeps):
+    api_client = make_retrying_client([(503, {})] * 4, max_retries=3)
+
+    with pytest.raises(requests.HTTPError):
+        api_client.get("countries/all/indicators/FP.CPI.TOTL")
+
+    assert len(api_client.session.requests) == 4
+    assert len(sleeps) == 3
+
+    api_client = make_retrying_client(
+        [requests.Timeout("timed out")] * 3, max_retries=2
+    )
+    with pytest.raises(requests.Timeout):
+        api_client.get("countries/all/indicators/FP.CPI.TOTL")
+    assert len(api_client.session.requests) == 3
+
+
+def test_backoff_is_full_jitter(make_retrying_client, sleeps, monkeypatch):
+    # the upper bound of each wait, jitter picks between 0 and it
+    bounds = []
+    monkeypatch.setattr(
+        world_bank_api.random,
+        "uniform",
+        lambda low, high: bounds.append((low, high)) or high,
+    )
+    api_client = make_retrying_client([(503, {})] * 8 + [(200, {})], max_retries=8)
+
+    api_client.get("countries/all/indicators/FP.CPI.TOTL")
+
+    assert bounds == [(0, min(30, 0.5 * 2**attempt)) for attempt in range(8)]
+    assert sleeps == [high for _, high in bounds]
+
+
+def test_retry_after_is_respected(make_retrying_client, sleeps):
+    api_client = make_retrying_client(
+        [(429, {"Retry-After": "7"}), (429, {"Retry-After": "120"}), (200, {})]
+    )
+
+    api_client.get("countries/all/indicators/FP.CPI.TOTL")
+
+    # capped at backoff_max
+    assert sleeps == [7, 30]